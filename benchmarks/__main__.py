@@ -0,0 +1,101 @@
+"""
+Runs the benchmark suite and prints the results as JSON.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --compare baseline.json --threshold 0.1
+
+With `--compare`, the run exits with status 1 if any per-event or latency
+figure is more than `--threshold` (a fraction) worse than the baseline.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Any
+
+from benchmarks import (
+    bench_logging,
+    bench_processors,
+    bench_requests,
+    bench_startup,
+)
+
+SUITES = {
+    "processors": bench_processors.run,
+    "logging": bench_logging.run,
+    "requests": bench_requests.run,
+    "startup": bench_startup.run,
+}
+
+# Lower is better for all of these
+COMPARED_METRICS = ("ns_per_event", "p50_ns", "p99_ns")
+
+
+def find_regressions(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    def key(result: dict[str, Any]) -> tuple[str, str, str]:
+        return (result["benchmark"], result["case"], result.get("mode", ""))
+
+    baseline_by_key = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(key(result))
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in result or not previous.get(metric):
+                continue
+            # Overheads can be negative or tiny, so only gate on real figures
+            if previous[metric] <= 0:
+                continue
+            change = result[metric] / previous[metric] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{'/'.join(filter(None, key(result)))} {metric}: "
+                    f"{previous[metric]:.0f} -> {result[metric]:.0f} "
+                    f"(+{change:.0%})"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--suite", choices=list(SUITES), action="append", default=None
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results: list[dict[str, Any]] = []
+    for suite in args.suite or list(SUITES):
+        results.extend(SUITES[suite]())
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    rendered = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(rendered + "\n")
+    else:
+        print(rendered)
+
+    if args.compare is None:
+        return 0
+    baseline = json.loads(args.compare.read_text())["results"]
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Measures what common `LogSettings` combinations cost per event, for both
+the sync and the `a*` logging methods.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from speedbeaver.config import LogSettings
+from speedbeaver.handlers import (
+    LogFileSettings,
+    LogStreamSettings,
+    LogTestSettings,
+)
+from speedbeaver.methods import get_logger
+from speedbeaver.queue_handler import stop_listener
+
+EVENTS = 20_000
+
+CASES: dict[str, dict[str, Any]] = {
+    "console": {"callsite_preset": "none"},
+    "console+callsite": {},
+    "fast-console": {
+        "stream": LogStreamSettings(fast_console=True),
+        "callsite_preset": "none",
+    },
+    "json": {
+        "stream": LogStreamSettings(json_logs=True),
+        "callsite_preset": "none",
+    },
+    "json+callsite": {"stream": LogStreamSettings(json_logs=True)},
+    "stream+file+test": {
+        "stream": LogStreamSettings(json_logs=True),
+        "file": LogFileSettings(
+            enabled=True, json_logs=True, file_name="bench.log"
+        ),
+        "test": LogTestSettings(enabled=True, file_name="bench.test.log"),
+    },
+}
+
+
+@contextmanager
+def isolated_logging() -> Iterator[None]:
+    """
+    Runs in a scratch directory with stderr sent to /dev/null, and tears
+    down whatever handlers were configured on the way out.
+    """
+    cwd = os.getcwd()
+    stderr = sys.stderr
+    with (
+        tempfile.TemporaryDirectory() as scratch,
+        open(os.devnull, "w") as devnull,
+    ):
+        os.chdir(scratch)
+        (Path(scratch) / "logs").mkdir()
+        sys.stderr = devnull
+        try:
+            yield
+        finally:
+            stop_listener()
+            root_logger = logging.getLogger()
+            for handler in root_logger.handlers:
+                handler.close()
+            root_logger.handlers = []
+            sys.stderr = stderr
+            os.chdir(cwd)
+
+
+def _result(case: str, mode: str, elapsed_ns: int) -> dict[str, Any]:
+    return {
+        "benchmark": "logging",
+        "case": case,
+        "mode": mode,
+        "events": EVENTS,
+        "ns_per_event": elapsed_ns / EVENTS,
+        "events_per_sec": EVENTS / (elapsed_ns / 1e9),
+    }
+
+
+def bench_sync(case: str, settings: dict[str, Any]) -> dict[str, Any]:
+    with isolated_logging():
+        LogSettings(**settings).configure()
+        logger = get_logger("benchmark")
+        start = time.perf_counter_ns()
+        for i in range(EVENTS):
+            logger.info("Benchmark event %s", i, user_id=i)
+        elapsed = time.perf_counter_ns() - start
+    return _result(case, "sync", elapsed)
+
+
+def bench_async(case: str, settings: dict[str, Any]) -> dict[str, Any]:
+    async def log_events() -> int:
+        logger = get_logger("benchmark")
+        start = time.perf_counter_ns()
+        for i in range(EVENTS):
+            await logger.ainfo("Benchmark event %s", i, user_id=i)
+        return time.perf_counter_ns() - start
+
+    with isolated_logging():
+        LogSettings(**settings).configure()
+        elapsed = asyncio.run(log_events())
+    return _result(case, "async", elapsed)
+
+
+def run() -> list[dict[str, Any]]:
+    results = []
+    for case, settings in CASES.items():
+        results.append(bench_sync(case, settings))
+        results.append(bench_async(case, settings))
+    return results
@@ -0,0 +1,75 @@
+"""
+Compares the per-event cost of the default processor chain when structlog
+walks it as a list against the compiled pipeline.
+"""
+
+import logging
+import timeit
+from typing import Any
+
+import structlog
+
+from speedbeaver.processor_collection_builder import ProcessorCollectionBuilder
+
+ITERATIONS = 50_000
+
+
+def _builder() -> ProcessorCollectionBuilder:
+    return (
+        ProcessorCollectionBuilder()
+        .add_log_level()
+        .add_logger_name()
+        .add_positional_arguments()
+        .add_timestamp()
+        .add_stack_info_renderer()
+    )
+
+
+def _run_list(processors, logger):
+    def run():
+        event_dict = {"event": "hello %s", "positional_args": ("world",)}
+        for processor in processors:
+            event_dict = processor(logger, "info", event_dict)
+        return event_dict
+
+    return run
+
+
+def _run_compiled(processor, logger):
+    def run():
+        event_dict = {"event": "hello %s", "positional_args": ("world",)}
+        return processor(logger, "info", event_dict)
+
+    return run
+
+
+def run() -> list[dict[str, Any]]:
+    logger = logging.getLogger("benchmark")
+    structlog.contextvars.bind_contextvars(request_id="benchmark")
+    cases = {
+        "list": _run_list(_builder().get_processors(), logger),
+        "compiled": _run_compiled(_builder().compile(), logger),
+        "compiled-redaction-keys": _run_compiled(
+            _builder().add_redaction().compile(), logger
+        ),
+        "compiled-redaction": _run_compiled(
+            _builder()
+            .add_redaction(value_patterns=("bearer", "query_secrets"))
+            .compile(),
+            logger,
+        ),
+    }
+    results = []
+    for case, runner in cases.items():
+        best = min(timeit.repeat(runner, number=ITERATIONS, repeat=5))
+        results.append(
+            {
+                "benchmark": "processors",
+                "case": case,
+                "events": ITERATIONS,
+                "ns_per_event": best / ITERATIONS * 1e9,
+                "events_per_sec": ITERATIONS / best,
+            }
+        )
+    structlog.contextvars.unbind_contextvars("request_id")
+    return results
@@ -0,0 +1,73 @@
+"""
+Measures the end-to-end overhead `quick_configure` adds to a bare FastAPI
+app, driven in-process through httpx's ASGI transport.
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.bench_logging import isolated_logging
+from speedbeaver.middleware import quick_configure
+
+REQUESTS = 2_000
+WARMUP = 100
+
+
+def _app(configured: bool) -> FastAPI:
+    app = FastAPI()
+    if configured:
+        quick_configure(app, callsite_preset="none")
+
+    @app.get("/")
+    async def index():
+        return {"message": "Hello, world!"}
+
+    return app
+
+
+def _percentile(sorted_values: list[int], percentile: float) -> int:
+    index = round(percentile / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+
+async def _drive(app: FastAPI) -> dict[str, Any]:
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        for _ in range(WARMUP):
+            await client.get("/")
+        latencies: list[int] = []
+        start = time.perf_counter_ns()
+        for _ in range(REQUESTS):
+            request_start = time.perf_counter_ns()
+            await client.get("/")
+            latencies.append(time.perf_counter_ns() - request_start)
+        elapsed = time.perf_counter_ns() - start
+
+    latencies.sort()
+    return {
+        "requests": REQUESTS,
+        "requests_per_sec": REQUESTS / (elapsed / 1e9),
+        "p50_ns": _percentile(latencies, 50),
+        "p99_ns": _percentile(latencies, 99),
+    }
+
+
+def run() -> list[dict[str, Any]]:
+    with isolated_logging():
+        bare = asyncio.run(_drive(_app(configured=False)))
+        configured = asyncio.run(_drive(_app(configured=True)))
+    return [
+        {"benchmark": "requests", "case": "bare", **bare},
+        {"benchmark": "requests", "case": "quick_configure", **configured},
+        {
+            "benchmark": "requests",
+            "case": "overhead",
+            "p50_ns": configured["p50_ns"] - bare["p50_ns"],
+            "p99_ns": configured["p99_ns"] - bare["p99_ns"],
+        },
+    ]
@@ -0,0 +1,65 @@
+"""
+Measures how long a fresh interpreter takes to import speedbeaver and get
+to a configured logger, which short-lived workers and CLI jobs pay on
+every start. Each case runs in its own subprocess, so nothing is cached.
+"""
+
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+RUNS = 15
+
+# Each snippet is timed from just before its first line to its end
+CASES = {
+    "import-get-logger": "from speedbeaver import get_logger",
+    "import-settings": "from speedbeaver import LogSettings",
+    "import-middleware": "from speedbeaver import StructlogMiddleware",
+    "configure": (
+        "from speedbeaver import LogSettings\n"
+        "LogSettings(stream={'enabled': False}).configure()"
+    ),
+}
+
+_TEMPLATE = """\
+import sys, time
+start = time.perf_counter_ns()
+{snippet}
+elapsed = time.perf_counter_ns() - start
+web = {{"fastapi", "starlette"}} & set(sys.modules)
+print(elapsed, len(sys.modules), int(bool(web)))
+"""
+
+
+def _time_case(snippet: str) -> tuple[list[int], int, bool]:
+    timings = []
+    modules, web_stack = 0, False
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", _TEMPLATE.format(snippet=snippet)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        timings.append(int(output[0]))
+        modules, web_stack = int(output[1]), output[2] == "1"
+    return timings, modules, web_stack
+
+
+def run() -> list[dict[str, Any]]:
+    results = []
+    for case, snippet in CASES.items():
+        timings, modules, web_stack = _time_case(snippet)
+        results.append(
+            {
+                "benchmark": "startup",
+                "case": case,
+                "runs": RUNS,
+                "p50_ns": statistics.median(timings),
+                "min_ns": min(timings),
+                "modules_loaded": modules,
+                "imports_web_stack": web_stack,
+            }
+        )
+    return results
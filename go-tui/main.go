@@ -3,8 +3,11 @@ package main
 import (
 	"bufio"
 	"encoding/json"
+	"flag"
 	"fmt"
+	"io"
 	"log"
+	"net"
 	"os"
 	"strings"
 	"time"
@@ -43,6 +46,7 @@ type LogEntry struct {
 	Message   string    `json:"message"`
 	RequestID string    `json:"request_id,omitempty"`
 	Logger    string    `json:"logger,omitempty"`
+	PID       int       `json:"pid,omitempty"`
 	Extra     map[string]interface{} `json:"extra,omitempty"`
 }
 
@@ -61,9 +65,7 @@ func NewTUIModel() *TUIModel {
 }
 
 func (m *TUIModel) Init() tea.Cmd {
-	return tea.Batch(
-		listenForLogs(),
-	)
+	return nil
 }
 
 func (m *TUIModel) Update(msg tea.Msg) (tea.Model, tea.Cmd) {
@@ -149,10 +151,16 @@ func (m *TUIModel) View() string {
 		if entry.Logger != "" {
 			loggerInfo = fmt.Sprintf(" (%s)", entry.Logger)
 		}
+
+		pidInfo := ""
+		if entry.PID != 0 {
+			pidInfo = fmt.Sprintf(" <%d>", entry.PID)
+		}
 		
-		logLine := fmt.Sprintf("%s %s%s%s %s",
+		logLine := fmt.Sprintf("%s %s%s%s%s %s",
 			timestamp,
 			levelStyle.Render(levelStr),
+			pidInfo,
 			requestInfo,
 			loggerInfo,
 			entry.Message,
@@ -179,36 +187,90 @@ func (m *TUIModel) View() string {
 	return strings.Join(content, "\n")
 }
 
-func listenForLogs() tea.Cmd {
-	return func() tea.Msg {
-		scanner := bufio.NewScanner(os.Stdin)
-		for scanner.Scan() {
-			line := scanner.Text()
-			if line == "" {
-				continue
-			}
-			
-			var entry LogEntry
-			if err := json.Unmarshal([]byte(line), &entry); err != nil {
-				now := time.Now()
-				entry = LogEntry{
-					Timestamp: float64(now.Unix()) + float64(now.Nanosecond())/1e9,
-					Level:     "INFO",
-					Message:   line,
-				}
+// readLogs forwards every JSON line from r to the program until r is closed.
+func readLogs(p *tea.Program, r io.Reader) {
+	scanner := bufio.NewScanner(r)
+	scanner.Buffer(make([]byte, 0, 64*1024), 1024*1024)
+	for scanner.Scan() {
+		line := scanner.Text()
+		if line == "" {
+			continue
+		}
+
+		var entry LogEntry
+		if err := json.Unmarshal([]byte(line), &entry); err != nil {
+			now := time.Now()
+			entry = LogEntry{
+				Timestamp: float64(now.Unix()) + float64(now.Nanosecond())/1e9,
+				Level:     "INFO",
+				Message:   line,
 			}
-			
-			return logMsg(entry)
 		}
-		return tea.Quit()
+
+		p.Send(logMsg(entry))
+	}
+}
+
+// listenOnSocket accepts log streams from any number of workers on a Unix
+// socket, so one viewer can be shared by every process on the host.
+func listenOnSocket(p *tea.Program, socketPath string) (net.Listener, error) {
+	if conn, err := net.Dial("unix", socketPath); err == nil {
+		conn.Close()
+		return nil, fmt.Errorf("a viewer is already listening on %s", socketPath)
+	}
+	// Whatever is left at the path is a stale socket from a previous viewer
+	os.Remove(socketPath)
+
+	listener, err := net.Listen("unix", socketPath)
+	if err != nil {
+		return nil, err
 	}
+
+	go func() {
+		for {
+			conn, err := listener.Accept()
+			if err != nil {
+				return
+			}
+			go func() {
+				defer conn.Close()
+				readLogs(p, conn)
+			}()
+		}
+	}()
+	return listener, nil
 }
 
 func main() {
+	socketPath := flag.String("socket", "", "listen for logs on this Unix socket instead of stdin")
+	flag.Parse()
+
 	model := NewTUIModel()
 	p := tea.NewProgram(model, tea.WithAltScreen())
-	
-	if _, err := p.Run(); err != nil {
-		log.Fatalf("Error running TUI: %v", err)
+
+	cleanup := func() {}
+	if *socketPath != "" {
+		listener, err := listenOnSocket(p, *socketPath)
+		if err != nil {
+			log.Fatalf("Error listening on %s: %v", *socketPath, err)
+		}
+		// Not deferred, so that it also runs when the TUI fails. A socket
+		// left behind would have workers start new viewers forever.
+		cleanup = func() {
+			listener.Close()
+			os.Remove(*socketPath)
+		}
+	} else {
+		go func() {
+			readLogs(p, os.Stdin)
+			p.Quit()
+		}()
 	}
-}
\ No newline at end of file
+
+	_, err := p.Run()
+	cleanup()
+	if err != nil {
+		log.Printf("Error running TUI: %v", err)
+		os.Exit(1)
+	}
+}
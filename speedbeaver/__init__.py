@@ -1,9 +1,13 @@
-from speedbeaver.config import LogLevel, LogSettings
-from speedbeaver.methods import get_logger
-from speedbeaver.middleware import StructlogMiddleware, quick_configure
-from speedbeaver.processor_collection_builder import (
-    ProcessorCollectionBuilder,
-)
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from speedbeaver.config import LogLevel, LogSettings
+    from speedbeaver.methods import get_logger
+    from speedbeaver.middleware import StructlogMiddleware, quick_configure
+    from speedbeaver.processor_collection_builder import (
+        ProcessorCollectionBuilder,
+    )
 
 __all__ = [
     "StructlogMiddleware",
@@ -13,3 +17,27 @@ __all__ = [
     "quick_configure",
     "LogSettings",
 ]
+
+# Imported on first access, so `get_logger` doesn't pull in pydantic and
+# `LogSettings` doesn't pull in the web stack
+_LAZY_ATTRIBUTES = {
+    "StructlogMiddleware": "speedbeaver.middleware",
+    "quick_configure": "speedbeaver.middleware",
+    "ProcessorCollectionBuilder": "speedbeaver.processor_collection_builder",
+    "LogLevel": "speedbeaver.common",
+    "LogSettings": "speedbeaver.config",
+    "get_logger": "speedbeaver.methods",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
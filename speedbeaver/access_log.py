@@ -0,0 +1,120 @@
+import random
+import re
+
+from pydantic.main import BaseModel
+
+from speedbeaver.route_stats import RouteLatencyStats
+
+
+def _compile_globs(patterns: list[str]) -> re.Pattern[str] | None:
+    """
+    Compiles a list of glob patterns (only `*` and `?` are special) into a
+    single regex, with one named group per pattern so the matching pattern
+    can be found in one pass.
+    """
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(
+            f"(?P<p{index}>{_glob_to_regex(pattern)})"
+            for index, pattern in enumerate(patterns)
+        )
+    )
+
+
+def _glob_to_regex(pattern: str) -> str:
+    return re.escape(pattern).replace(r"\*", ".*").replace(r"\?", ".") + r"\Z"
+
+
+class AccessLogPolicy:
+    """
+    Decides whether an access line gets logged, and at what sample rate.
+    Built from `AccessLogSettings.policy()`. Route patterns are globs, and
+    the first matching pattern wins.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        exclude_paths: list[str],
+        sample_rate: float,
+        route_sample_rates: dict[str, float],
+        always_log_errors: bool,
+        slow_threshold_ms: float | None,
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.always_log_errors = always_log_errors
+        self.slow_threshold_ns = (
+            None
+            if slow_threshold_ms is None
+            else int(slow_threshold_ms * 1_000_000)
+        )
+        self._exclude = _compile_globs(exclude_paths)
+        self._route_rates = list(route_sample_rates.values())
+        self._routes = _compile_globs(list(route_sample_rates))
+
+    def sample(
+        self, path: str, status_code: int, duration: int
+    ) -> float | None:
+        """
+        Returns the rate the access line was sampled at, or None if it
+        should be dropped.
+        """
+        if not self.enabled:
+            return None
+        if self.always_log_errors and status_code >= 400:
+            return 1.0
+        if self.slow_threshold_ns is not None and (
+            duration >= self.slow_threshold_ns
+        ):
+            return 1.0
+        if self._exclude is not None and self._exclude.match(path):
+            return None
+
+        rate = self.sample_rate
+        if self._routes is not None:
+            route_match = self._routes.match(path)
+            if route_match is not None:
+                # Group names are p0, p1... in the order the routes were given
+                index = int(route_match.lastgroup[1:])  # type: ignore[index]
+                rate = self._route_rates[index]
+
+        if rate >= 1.0:
+            return 1.0
+        if rate <= 0.0 or random.random() >= rate:
+            return None
+        return rate
+
+
+class AccessLogSettings(BaseModel):
+    enabled: bool = True
+    exclude_paths: list[str] = []
+    sample_rate: float = 1.0
+    route_sample_rates: dict[str, float] = {}
+    always_log_errors: bool = True
+    slow_threshold_ms: float | None = None
+    # Periodic per-route latency summaries, see speedbeaver.route_stats
+    route_stats: bool = False
+    route_stats_interval_s: float = 60.0
+    # Replaces per-request lines with the summaries, apart from the errors
+    # and slow requests that are always logged
+    route_stats_only: bool = False
+
+    def policy(self) -> AccessLogPolicy:
+        summaries_only = self.route_stats and self.route_stats_only
+        return AccessLogPolicy(
+            enabled=self.enabled,
+            exclude_paths=self.exclude_paths,
+            sample_rate=0.0 if summaries_only else self.sample_rate,
+            route_sample_rates={}
+            if summaries_only
+            else self.route_sample_rates,
+            always_log_errors=self.always_log_errors,
+            slow_threshold_ms=self.slow_threshold_ms,
+        )
+
+    def route_latency_stats(self) -> RouteLatencyStats | None:
+        if not self.route_stats:
+            return None
+        return RouteLatencyStats(interval=self.route_stats_interval_s)
@@ -0,0 +1,313 @@
+"""
+Multi-process log aggregation for pre-fork deployments.
+
+Worker processes render records locally and ship them over a Unix socket
+to a single writer process, which owns the log file and does all batching,
+rotation checks and fsyncs. Run the writer yourself with
+`python -m speedbeaver.aggregation --socket PATH --file FILE`, or let the
+first worker that needs it start one.
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from speedbeaver.background import BackgroundSender, start_once, try_lock
+from speedbeaver.handlers import BufferedFileHandler
+from speedbeaver.rotation import COMPRESSION_SUFFIXES, RotationPolicy
+
+# Payload length, then the record's level so the writer can flush early
+FRAME_HEADER = struct.Struct("!IB")
+
+
+def encode_frame(payload: bytes, levelno: int) -> bytes:
+    return FRAME_HEADER.pack(len(payload), min(levelno, 255)) + payload
+
+
+class AggregatingHandler(BackgroundSender[tuple[bytes, int]], logging.Handler):
+    """
+    Renders records in the worker and hands them to a sender thread, which
+    ships them to the aggregator's socket in batches. The queue between the
+    two holds at most `buffer_size` records, dropping the oldest (counted in
+    `dropped`) so a slow writer never blocks the worker. While the
+    aggregator can't be reached, records are written straight to a file of
+    the worker's own next to `fallback_file_name`, since the aggregator may
+    still be writing to and rotating that one.
+    """
+
+    sender_thread_name = "speedbeaver-aggregation-sender"
+
+    def __init__(
+        self,
+        socket_path: str,
+        fallback_file_name: str,
+        server_args: list[str] | None = None,
+        buffer_size: int = 10_000,
+        reconnect_interval: float = 5.0,
+    ):
+        super().__init__()
+        self._init_sender(buffer_size, reconnect_interval)
+        self.socket_path = socket_path
+        self.fallback_file_name = fallback_file_name
+        self.server_args = server_args
+        self.connection_failures = 0
+        self._fallback: BufferedFileHandler | None = None
+        self._socket: socket.socket | None = None
+        self._start_sender()
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._fallback is not None:
+            # Only ever called after a fork, the parent flushes the rest
+            self._fallback.buffer.clear()
+            self._fallback = None
+
+    def _connect(self) -> socket.socket | None:
+        if not self._connect_due():
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+            return sock
+        except OSError:
+            sock.close()
+        if self.server_args is not None and start_aggregator(
+            self.socket_path, self.server_args
+        ):
+            # The writer needs a moment to start listening
+            self._next_connect = time.monotonic() + 0.5
+        return None
+
+    def _write_fallback(self, entries: list[tuple[bytes, int]]):
+        if self._fallback is None:
+            self._fallback = BufferedFileHandler(
+                f"{self.fallback_file_name}.fallback-{os.getpid()}"
+            )
+        for line, levelno in entries:
+            self._fallback.write(line, levelno)
+
+    def _send(self, entries: list[tuple[bytes, int]]) -> bool:
+        if self._socket is None:
+            self._socket = self._connect()
+        if self._socket is None:
+            self._write_fallback(entries)
+            return True
+        frames = [encode_frame(line, levelno) for line, levelno in entries]
+        data = memoryview(b"".join(frames))
+        sent = 0
+        try:
+            # Not sendall(), which doesn't say how much it sent on failure
+            while sent < len(data):
+                sent += self._socket.send(data[sent:])
+        except OSError:
+            self.connection_failures += 1
+            self._socket.close()
+            self._socket = None
+            # Frames that were sent in full are the aggregator's. It drops
+            # a partly sent one, so that one goes to the fallback too.
+            delivered = 0
+            for frame in frames:
+                if sent < len(frame):
+                    break
+                sent -= len(frame)
+                delivered += 1
+            self._write_fallback(entries[delivered:])
+        return True
+
+    def emit(self, record):
+        self.emit_rendered(record, self.format(record))
+
+    def emit_rendered(self, record: logging.LogRecord, message: str | bytes):
+        try:
+            if isinstance(message, str):
+                message = (message + "\n").encode()
+            self._reset_if_forked()
+            self._enqueue((message, record.levelno))
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self._stop_sender()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._fallback is not None:
+            self._fallback.close()
+        super().close()
+
+
+def start_aggregator(socket_path: str, server_args: list[str]) -> bool:
+    """
+    Starts a detached writer process for `socket_path`, unless a writer
+    already holds its lock. Returns whether one was started.
+    """
+    return start_once(
+        socket_path,
+        [
+            sys.executable,
+            "-m",
+            "speedbeaver.aggregation",
+            "--socket",
+            socket_path,
+            *server_args,
+        ],
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+class _FrameHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        assert isinstance(server, AggregatorServer)
+        with server.track_connection():
+            while True:
+                header = self.rfile.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    return
+                length, levelno = FRAME_HEADER.unpack(header)
+                payload = self.rfile.read(length)
+                if len(payload) < length:
+                    return
+                server.writer.write(payload, levelno)
+
+
+class AggregatorServer(socketserver.ThreadingUnixStreamServer):
+    """
+    The single writer process' server. Every worker connection gets its own
+    thread, and all of them write through one `BufferedFileHandler`. If
+    `idle_timeout` is set, the server stops once no worker has been
+    connected for that many seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        writer: BufferedFileHandler,
+        idle_timeout: float | None = None,
+    ):
+        self.writer = writer
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self._idle_since = time.monotonic()
+        self._connections_lock = threading.Lock()
+        super().__init__(socket_path, _FrameHandler)
+
+    @contextlib.contextmanager
+    def track_connection(self):
+        with self._connections_lock:
+            self.connections += 1
+        try:
+            yield
+        finally:
+            with self._connections_lock:
+                self.connections -= 1
+                self._idle_since = time.monotonic()
+
+    def service_actions(self):
+        if self.idle_timeout is None:
+            return
+        with self._connections_lock:
+            idle = (
+                self.connections == 0
+                and time.monotonic() - self._idle_since >= self.idle_timeout
+            )
+        if idle:
+            # shutdown() blocks until serve_forever returns, so it can't be
+            # called from the serving thread itself
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+def serve(
+    socket_path: str,
+    file_name: str,
+    buffer_size: int = 64 * 1024,
+    flush_interval: float = 1.0,
+    fsync_interval: float | None = None,
+    idle_timeout: float | None = None,
+    rotation: RotationPolicy | None = None,
+) -> None:
+    # Only one writer per socket, for as long as it runs
+    lock_file = try_lock(socket_path)
+    if lock_file is None:
+        return
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    writer = BufferedFileHandler(
+        file_name,
+        buffer_size=buffer_size,
+        flush_interval=flush_interval,
+        fsync_interval=fsync_interval,
+        rotation=rotation,
+    )
+    server = AggregatorServer(socket_path, writer, idle_timeout=idle_timeout)
+    try:
+        server.serve_forever(poll_interval=1.0)
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        writer.close()
+        lock_file.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m speedbeaver.aggregation",
+        description="Single writer process for aggregated speedbeaver logs.",
+    )
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--file", required=True)
+    parser.add_argument("--buffer-size", type=int, default=64 * 1024)
+    parser.add_argument("--flush-interval-ms", type=int, default=1000)
+    parser.add_argument("--fsync-interval-ms", type=int, default=None)
+    parser.add_argument("--idle-timeout", type=float, default=None)
+    parser.add_argument("--rotate-bytes", type=int, default=None)
+    parser.add_argument("--rotate-interval-s", type=float, default=None)
+    parser.add_argument("--backup-count", type=int, default=5)
+    parser.add_argument(
+        "--compression",
+        choices=[*COMPRESSION_SUFFIXES, "none"],
+        default="gzip",
+    )
+    args = parser.parse_args(argv)
+
+    rotation = None
+    if args.rotate_bytes is not None or args.rotate_interval_s is not None:
+        rotation = RotationPolicy(
+            max_bytes=args.rotate_bytes,
+            interval=args.rotate_interval_s,
+            backup_count=args.backup_count,
+            compression=None
+            if args.compression == "none"
+            else args.compression,
+        )
+
+    serve(
+        args.socket,
+        args.file,
+        buffer_size=args.buffer_size,
+        flush_interval=args.flush_interval_ms / 1000,
+        fsync_interval=None
+        if args.fsync_interval_ms is None
+        else args.fsync_interval_ms / 1000,
+        idle_timeout=args.idle_timeout,
+        rotation=rotation,
+    )
+
+
+if __name__ == "__main__":
+    main()
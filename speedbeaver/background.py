@@ -0,0 +1,152 @@
+"""
+Machinery shared by the handlers that hand rendered records to a background
+thread, which sends them on to another process in batches.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import IO, Any, Generic, TypeVar
+
+Entry = TypeVar("Entry")
+
+
+class BackgroundSender(Generic[Entry]):
+    """
+    Queues entries in a ring buffer of `buffer_size` entries that a sender
+    thread drains, handing everything queued to `_send()` as one batch. If
+    the sender can't keep up, the oldest entries are dropped and counted in
+    `dropped`, so a slow receiver never blocks the logging thread.
+
+    Subclasses call `_init_sender()` from their `__init__`, then
+    `_start_sender()` once they have somewhere to send to, and implement
+    `_send()` and `_disconnect()`.
+    """
+
+    sender_thread_name = "speedbeaver-sender"
+
+    def _init_sender(self, buffer_size: int, reconnect_interval: float):
+        self.buffer: deque[Entry] = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.reconnect_interval = reconnect_interval
+        self._pid = os.getpid()
+        self._next_connect = 0.0
+        self._stopping = False
+        self._sender_thread: threading.Thread | None = None
+
+    def _start_sender(self):
+        self._wakeup = threading.Event()
+        self._sender_thread = threading.Thread(
+            target=self._send_batches,
+            name=self.sender_thread_name,
+            daemon=True,
+        )
+        self._sender_thread.start()
+
+    def _send(self, entries: list[Entry]) -> bool:
+        """
+        Sends one batch, returning False if the sender should stop.
+        """
+        raise NotImplementedError
+
+    def _disconnect(self):
+        raise NotImplementedError
+
+    def _connect_due(self) -> bool:
+        """
+        Whether it's time for another connection attempt. Attempts are
+        spaced out by `reconnect_interval`.
+        """
+        now = time.monotonic()
+        if now < self._next_connect:
+            return False
+        self._next_connect = now + self.reconnect_interval
+        return True
+
+    def _reset_if_forked(self):
+        """
+        Threads don't survive a fork, and anything still queued or
+        connected belongs to the parent process. A sender that was running
+        in the parent is restarted for the child.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.buffer.clear()
+        self._disconnect()
+        self._next_connect = 0.0
+        if self._sender_thread is not None:
+            self._start_sender()
+
+    def _enqueue(self, entry: Entry):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(entry)
+        self._wakeup.set()
+
+    def _drain(self) -> list[Entry]:
+        entries: list[Entry] = []
+        while True:
+            try:
+                entries.append(self.buffer.popleft())
+            except IndexError:
+                return entries
+
+    def _send_batches(self):
+        while True:
+            self._wakeup.wait()
+            # Cleared before draining so entries queued mid-drain wake us
+            # up again
+            self._wakeup.clear()
+            entries = self._drain()
+            if entries and not self._send(entries):
+                return
+            if self._stopping and not self.buffer:
+                return
+
+    def _stop_sender(self):
+        self._stopping = True
+        sender_thread = self._sender_thread
+        if sender_thread is not None:
+            self._wakeup.set()
+            # The sender drains the buffer before it stops. The timeout
+            # only kicks in if the receiver stops reading.
+            sender_thread.join(timeout=5.0)
+            self._sender_thread = None
+
+
+def try_lock(socket_path: str) -> IO[Any] | None:
+    """
+    Takes the non-blocking lock next to `socket_path`, returning the open
+    lock file, or None if another process holds it.
+    """
+    import fcntl
+
+    lock_file = open(f"{socket_path}.lock", "w")  # noqa: SIM115
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def start_once(socket_path: str, args: list[str], **popen_kwargs: Any) -> bool:
+    """
+    Starts the process that listens on `socket_path`, unless another
+    process holds its lock. Of several workers finding the socket missing at
+    once, only one starts it, and the rest connect on their next attempt.
+    Returns whether it was started.
+    """
+    lock_file = try_lock(socket_path)
+    if lock_file is None:
+        return False
+    # Released first, so the process can hold it for as long as it runs
+    lock_file.close()
+    try:
+        subprocess.Popen(args, **popen_kwargs)
+        return True
+    except Exception:
+        return False
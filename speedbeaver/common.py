@@ -1,3 +1,5 @@
+import logging
+import sys
 from typing import Literal
 
 LogLevel = (
@@ -8,3 +10,16 @@ LogLevel = (
     | Literal["CRITICAL"]
     | Literal["FATAL"]
 )
+
+
+def resolve_exc_info(record: logging.LogRecord) -> None:
+    """
+    Swaps `exc_info=True` in a structlog record's event dict for the
+    exception being handled right now. Renderers would otherwise look it up
+    with `sys.exc_info()` when they get to the record, which finds nothing,
+    or another exception, on another thread or later on.
+    """
+    event_dict = record.msg
+    if isinstance(event_dict, dict) and event_dict.get("exc_info") is True:
+        exc_info = sys.exc_info()
+        event_dict["exc_info"] = exc_info if exc_info[0] is not None else False
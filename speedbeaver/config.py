@@ -1,5 +1,5 @@
 import logging
-from typing import TypedDict
+from typing import Any, TypedDict
 
 import structlog
 from pydantic_settings import (
@@ -10,14 +10,35 @@ from pydantic_settings import (
 from structlog.typing import Processor
 from typing_extensions import NotRequired
 
+from speedbeaver.access_log import AccessLogSettings
 from speedbeaver.common import LogLevel
+from speedbeaver.escalation import DebugEscalationSettings
 from speedbeaver.handlers import (
+    FanOutHandler,
     LogFileSettings,
     LogStreamSettings,
     LogTestSettings,
 )
+from speedbeaver.loggers import (
+    AsyncBoundLogger,
+    make_adjustable_bound_logger,
+    set_min_level,
+)
 from speedbeaver.methods import get_logger
+from speedbeaver.metrics import MetricsSettings, pipeline_metrics
 from speedbeaver.processor_collection_builder import ProcessorCollectionBuilder
+from speedbeaver.processors import CallsitePreset, ignore_internal_frames
+from speedbeaver.queue_handler import LogQueueSettings, set_active_listener
+from speedbeaver.redaction import RedactionSettings
+from speedbeaver.runtime import (
+    LogRuntime,
+    RuntimeControlSettings,
+    set_active_runtime,
+)
+from speedbeaver.tail_buffer import TailBufferSettings
+
+# The fingerprint and root handlers of the last `configure()` call
+_applied: tuple[tuple[Any, ...], list[logging.Handler]] | None = None
 
 
 class LogSettingsArgs(TypedDict):
@@ -25,11 +46,22 @@ class LogSettingsArgs(TypedDict):
     timestamp_format: NotRequired[str]
     logger_name: NotRequired[str]
     log_level: NotRequired[LogLevel | None]
+    callsite_preset: NotRequired[CallsitePreset]
+    callsite_min_level: NotRequired[LogLevel | None]
 
     stream: NotRequired[LogStreamSettings]
     file: NotRequired[LogFileSettings]
     test: NotRequired[LogTestSettings]
 
+    async_handlers: NotRequired[bool]
+    queue: NotRequired[LogQueueSettings]
+    access: NotRequired[AccessLogSettings]
+    metrics: NotRequired[MetricsSettings]
+    tail_buffer: NotRequired[TailBufferSettings]
+    runtime_control: NotRequired[RuntimeControlSettings]
+    debug_escalation: NotRequired[DebugEscalationSettings]
+    redaction: NotRequired[RedactionSettings]
+
     processor_override: NotRequired[list[Processor] | None]
     propagated_loggers: NotRequired[list[str] | None]
     cleared_loggers: NotRequired[list[str] | None]
@@ -46,39 +78,91 @@ class LogSettings(BaseSettings):
     file: LogFileSettings = LogFileSettings()
     test: LogTestSettings = LogTestSettings()
 
+    async_handlers: bool = False
+    queue: LogQueueSettings = LogQueueSettings()
+    access: AccessLogSettings = AccessLogSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    tail_buffer: TailBufferSettings = TailBufferSettings()
+    runtime_control: RuntimeControlSettings = RuntimeControlSettings()
+    debug_escalation: DebugEscalationSettings = DebugEscalationSettings()
+    redaction: RedactionSettings = RedactionSettings()
+
     opentelemetry: bool = False
     timestamp_format: str = "iso"
     logger_name: str = "app"
     log_level: LogLevel | None = None
+    callsite_preset: CallsitePreset = "full"
+    callsite_min_level: LogLevel | None = None
 
     processor_override: list[Processor] | None = None
     propagated_loggers: list[str] | None = None
     cleared_loggers: list[str] | None = None
 
-    def configure(self) -> None:
+    def configure(self, force: bool = False) -> None:
+        """
+        Sets up structlog and the root handlers. Calling it again with the
+        same settings does nothing, unless `force` is set or the root
+        handlers were changed in between.
+        """
+        global _applied
         if self.log_level:
             self.stream.log_level = self.log_level
             self.file.log_level = self.log_level
             self.test.log_level = self.log_level
+        fingerprint = self.fingerprint()
+        if (
+            not force
+            and _applied is not None
+            and _applied[0] == fingerprint
+            and logging.getLogger().handlers == _applied[1]
+        ):
+            return
+
         default_processors = self.get_default_processors()
 
+        # Callsite adders in an override would otherwise report the
+        # wrapper's frames for `log()` and inline calls
         shared_processors: list[Processor] = (
             default_processors
             if self.processor_override is None
-            else self.processor_override
+            else [
+                ignore_internal_frames(processor)
+                for processor in self.processor_override
+            ]
         )
 
+        # Calls below every sink's level return before doing any work. The
+        # class is shared and its level changed in place, so cached loggers
+        # follow both reconfiguration and runtime changes.
+        wrapper_class = make_adjustable_bound_logger(AsyncBoundLogger)
+        set_min_level(
+            wrapper_class, self.min_log_level(), self.escalation_level()
+        )
         structlog.configure(
             processors=shared_processors
             + [structlog.stdlib.ProcessorFormatter.wrap_for_formatter],
             logger_factory=structlog.stdlib.LoggerFactory(),
-            wrapper_class=structlog.stdlib.BoundLogger,
+            wrapper_class=wrapper_class,
             cache_logger_on_first_use=not self.test.enabled,
         )
 
-        self._setup_handlers(shared_processors)
+        self._setup_handlers(shared_processors, wrapper_class)
         self._setup_cleared_loggers(self.cleared_loggers)
         self._setup_propagated_loggers(self.propagated_loggers)
+        self.runtime_control.install_signal_handler()
+        _applied = (fingerprint, list(logging.getLogger().handlers))
+
+    def fingerprint(self) -> tuple[Any, ...]:
+        """
+        Identifies what `configure()` sets up. Processor overrides are
+        compared by identity.
+        """
+        return (
+            self.model_dump_json(exclude={"processor_override"}),
+            None
+            if self.processor_override is None
+            else tuple(self.processor_override),
+        )
 
     def get_default_processors(
         self,
@@ -88,46 +172,120 @@ class LogSettings(BaseSettings):
             .add_log_level()
             .add_logger_name()
             .add_positional_arguments()
-            .add_callsite_parameters()
+            .add_callsite_parameters(
+                preset=self.callsite_preset,
+                min_level=self.callsite_min_level,
+            )
             .add_timestamp(format=self.timestamp_format)
             .add_stack_info_renderer()
         )
+        if self.redaction.enabled:
+            default_processor_builder.add_redaction(
+                keys=self.redaction.keys,
+                key_patterns=self.redaction.key_patterns,
+                value_patterns=self.redaction.value_patterns,
+                replacement=self.redaction.replacement,
+                value_fields=self.redaction.value_fields,
+            )
         # if self.opentelemetry:
         #     default_processor_builder.add_opentelemetry()
 
-        return default_processor_builder.get_processors()
+        return [default_processor_builder.compile()]
 
     def get_logger(self):
         return get_logger(self.logger_name)
 
-    def _setup_handlers(self, shared_processors: list[Processor]):
-        handlers = []
-        stream_handler = self.stream.handler(shared_processors)
-        file_handler = self.file.handler(shared_processors)
-        test_handler = self.test.handler(shared_processors)
-        if stream_handler:
-            handlers.append(stream_handler)
-        if file_handler:
-            handlers.append(file_handler)
-        if test_handler:
-            handlers.append(test_handler)
+    def min_log_level(self) -> int:
+        """
+        The lowest level any enabled sink accepts. Everything is let
+        through while the tail buffer is enabled, since it holds on to
+        events below the sinks' levels.
+        """
+        levels = [
+            logging.getLevelName(settings.log_level)
+            for settings in (self.stream, self.file, self.test)
+            if settings.enabled
+        ]
+        if self.tail_buffer.enabled or not levels:
+            return logging.NOTSET
+        return min(levels)
+
+    def escalation_level(self) -> int | None:
+        """
+        The level requests escalated by `StructlogMiddleware` log from, or
+        None if escalation is off.
+        """
+        if not self.debug_escalation.enabled:
+            return None
+        return logging.getLevelName(self.debug_escalation.level)
+
+    def _setup_handlers(
+        self,
+        shared_processors: list[Processor],
+        wrapper_class: type[structlog.stdlib.BoundLogger],
+    ):
+        sinks = [
+            (settings.output(), sink)
+            for settings in (self.stream, self.file, self.test)
+            if (sink := settings.sink()) is not None
+        ]
+        handlers: list[logging.Handler] = []
+        fan_out = None
+        if sinks:
+            # Renders each record once per format instead of once per sink,
+            # and can hand bytes straight to the sinks
+            fan_out = FanOutHandler(
+                shared_processors,
+                sinks,
+                metrics=pipeline_metrics if self.metrics.enabled else None,
+            )
+            handlers = [fan_out]
+
+        queue_handler = None
+        if self.async_handlers:
+            # Formatting and I/O move to the queue listener's thread
+            queue_handler = self.queue.handler(handlers)
+            handlers = [queue_handler] if queue_handler else []
+
+        tail_filter = self.tail_buffer.filter()
+        if tail_filter is not None:
+            # Diverts low-level events into the request's buffer before
+            # they're queued or rendered
+            for handler in handlers:
+                handler.addFilter(tail_filter)
 
         root_logger = logging.getLogger()
-        root_logger.setLevel(logging.NOTSET)
+        # Foreign records below every sink's level are dropped up front too
+        root_logger.setLevel(self.min_log_level())
+        replaced = root_logger.handlers
         root_logger.handlers = handlers
+        # Stops the previous listener, which closes the handlers behind it
+        set_active_listener(queue_handler.listener if queue_handler else None)
+        for handler in replaced:
+            # Otherwise their flush and writer threads and files stay open
+            handler.close()
+        pipeline_metrics.set_handlers(
+            [sink for _, sink in sinks]
+            + ([queue_handler] if queue_handler else [])
+        )
+        set_active_runtime(
+            LogRuntime(
+                self.model_copy(deep=True),
+                fan_out,
+                wrapper_class,
+                queue_handler=queue_handler,
+            )
+        )
 
     def _setup_cleared_loggers(
         self,
         cleared_loggers: list[str] | None = None,
     ):
         default_cleared: list[str] = ["uvicorn.access"]
-        if cleared_loggers is None:
-            cleared_loggers = []
-        cleared_loggers.extend(default_cleared)
+        # Copied, so configuring again doesn't add the defaults twice
+        cleared_loggers = [*(cleared_loggers or []), *default_cleared]
 
-        for _cleared_log in (
-            cleared_loggers if cleared_loggers is not None else default_cleared
-        ):
+        for _cleared_log in cleared_loggers:
             # This prevents unwanted loggers from getting messages
             # through to begin with
             logging.getLogger(_cleared_log).handlers.clear()
@@ -139,15 +297,12 @@ class LogSettings(BaseSettings):
     ):
         # Usually you do want these to be active in case something breaks
         default_propagated: list[str] = ["uvicorn", "uvicorn.error"]
-        if propagated_loggers is None:
-            propagated_loggers = []
-        propagated_loggers.extend(default_propagated)
-
-        for _propagated_log in (
-            propagated_loggers
-            if propagated_loggers is not None
-            else default_propagated
-        ):
+        propagated_loggers = [
+            *(propagated_loggers or []),
+            *default_propagated,
+        ]
+
+        for _propagated_log in propagated_loggers:
             # This makes sure other loggers (third party) are handled
             # by structlog, not any other logger
             logging.getLogger(_propagated_log).handlers.clear()
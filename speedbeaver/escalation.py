@@ -0,0 +1,95 @@
+"""
+Per-request log level escalation.
+
+`StructlogMiddleware` can lower the level for a single request, when it
+carries a valid signed header or is picked by sampling, while the rest of
+the service stays at its configured level. The escalated level lives in a
+context variable, so only the request's own context sees it: other
+requests keep the cheap no-op methods for events below the sinks' levels.
+
+Escalated events get past the wrapper class, the `logging` logger's level
+and the sinks' levels, and aren't held back by the tail buffer. Records
+from other `logging` loggers keep following those loggers' own levels.
+
+A header value for a secret is made with `sign_escalation_token`:
+
+    X-Debug-Log: 1735787045.3b1f...
+"""
+
+import hashlib
+import hmac
+import random
+import time
+from contextvars import ContextVar, Token
+
+from pydantic import SecretStr
+from pydantic.main import BaseModel
+
+from speedbeaver.common import LogLevel
+
+_escalated_level: ContextVar[int | None] = ContextVar(
+    "speedbeaver_escalated_level", default=None
+)
+# The current context's escalated level, or None
+get_escalated_level = _escalated_level.get
+
+
+def is_escalated_for(levelno: int) -> bool:
+    """
+    Whether the current context has escalated to `levelno` or below.
+    """
+    level = _escalated_level.get()
+    return level is not None and levelno >= level
+
+
+def escalate(level: int) -> Token[int | None]:
+    return _escalated_level.set(level)
+
+
+def end_escalation(token: Token[int | None]) -> None:
+    _escalated_level.reset(token)
+
+
+def _signature(secret: str, expires: str) -> str:
+    return hmac.new(
+        secret.encode(), expires.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def sign_escalation_token(secret: str, ttl_s: float = 300.0) -> str:
+    """
+    Returns a header value that escalates requests until `ttl_s` seconds
+    from now.
+    """
+    expires = str(int(time.time() + ttl_s))
+    return f"{expires}.{_signature(secret, expires)}"
+
+
+def verify_escalation_token(secret: str, token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, expires))
+
+
+class DebugEscalationSettings(BaseModel):
+    enabled: bool = False
+    # Requests that are escalated log from this level up
+    level: LogLevel = "DEBUG"
+    # Escalates requests with a valid token from `sign_escalation_token`
+    # in this header. Without a secret, the header is ignored.
+    header: str = "X-Debug-Log"
+    secret: SecretStr | None = None
+    # Escalates this fraction of all requests
+    sample_rate: float = 0.0
+
+    def should_escalate(self, header_value: str | None) -> bool:
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return True
+        return (
+            header_value is not None
+            and self.secret is not None
+            and verify_escalation_token(
+                self.secret.get_secret_value(), header_value
+            )
+        )
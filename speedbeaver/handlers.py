@@ -1,17 +1,37 @@
+import abc
+import contextlib
+import functools
 import logging
 import logging.handlers
-import subprocess
-import json
 import os
+import socket
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Sequence
 from pathlib import Path
-from typing import Any
+from typing import (
+    IO,
+    Any,
+    BinaryIO,
+    NamedTuple,
+    Protocol,
+    cast,
+    runtime_checkable,
+)
 
 import orjson
 import structlog
 from pydantic.main import BaseModel
 from structlog.typing import Processor
 
+from speedbeaver.background import BackgroundSender, start_once
 from speedbeaver.common import LogLevel
+from speedbeaver.escalation import is_escalated_for
+from speedbeaver.metrics import LoggingMetrics
+from speedbeaver.renderers import FastConsoleRenderer
+from speedbeaver.rotation import Compression, RolledFileWorker, RotationPolicy
+from speedbeaver.tail_buffer import is_replaying
 
 
 def extract_from_record(_, __, event_dict):
@@ -33,159 +53,829 @@ def json_serializer(__obj: Any, /, **kwargs):
 json_renderer = structlog.processors.JSONRenderer(serializer=json_serializer)
 
 
+def json_default(obj: Any) -> Any:
+    """
+    Fallback for values orjson can't serialize natively (it handles
+    datetimes, UUIDs, dataclasses and enums itself): uses the value's
+    `__structlog__()` if it has one, like `JSONRenderer` does, and its
+    `repr()` otherwise.
+    """
+    try:
+        return obj.__structlog__()
+    except AttributeError:
+        return repr(obj)
+
+
+JSON_BYTES_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+
+def json_bytes_renderer(_, __, event_dict) -> bytes:
+    """
+    Renders the event as a complete JSON line in `bytes`, ready to be
+    written as is by sinks that accept bytes.
+    """
+    return orjson.dumps(
+        event_dict, default=json_default, option=JSON_BYTES_OPTIONS
+    )
+
+
+class LogOutput(NamedTuple):
+    """
+    Describes how a sink renders records. Sinks with equal outputs produce
+    the same text, so `FanOutHandler` renders it once for all of them.
+    """
+
+    json_logs: bool = False
+    colors: bool = False
+    fast_console: bool = False
+    thread_info: bool = False
+    # Renders JSON straight to bytes, for sinks that write bytes
+    bytes_native: bool = False
+
+    def renderer(self) -> Processor:
+        if self.json_logs and self.bytes_native:
+            return json_bytes_renderer
+        if self.json_logs:
+            return json_renderer
+        if self.fast_console:
+            return FastConsoleRenderer(colors=self.colors)
+        return structlog.dev.ConsoleRenderer(colors=self.colors)
+
+    def foreign_processors(self) -> list[Processor]:
+        """
+        Run only on `logging` entries that do NOT originate within structlog,
+        after the shared processors.
+        """
+        if self.json_logs:
+            return [structlog.processors.format_exc_info]
+        return []
+
+    def processors(self) -> list[Processor]:
+        """
+        Run on ALL entries after the shared processors are done.
+        """
+        return [
+            *([extract_from_record] if self.thread_info else []),
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            self.renderer(),
+        ]
+
+    def formatter(
+        self, shared_processors: list[Processor]
+    ) -> structlog.stdlib.ProcessorFormatter:
+        # Formatters must return `str`
+        return structlog.stdlib.ProcessorFormatter(
+            foreign_pre_chain=[
+                *shared_processors,
+                *self.foreign_processors(),
+            ],
+            processors=self._replace(bytes_native=False).processors(),
+        )
+
+
 class LogHandlerSettings(BaseModel):
     json_logs: bool = False
+    # Trades ConsoleRenderer's sorted keys for much cheaper rendering
+    fast_console: bool = False
     log_level: LogLevel = "DEBUG"
     enabled: bool = False
 
+    def output(self) -> LogOutput:
+        if self.json_logs:
+            return LogOutput(json_logs=True, bytes_native=True)
+        return LogOutput(fast_console=self.fast_console)
+
+    @abc.abstractmethod
+    def sink(self) -> logging.Handler | None:
+        """
+        Returns the handler that writes this sink's records, without a
+        formatter, or None if the sink is disabled.
+        """
 
-class TUIStreamHandler(logging.StreamHandler):
-    
-    def __init__(self, stream=None):
+    def handler(self, shared_processors: list[Processor]):
+        handler = self.sink()
+        if handler is None:
+            return None
+        handler.setFormatter(self.output().formatter(shared_processors))
+        return handler
+
+
+class BufferedFileHandler(logging.handlers.WatchedFileHandler):
+    """
+    A `WatchedFileHandler` that collects rendered lines in memory and writes
+    them in one go, once `buffer_size` bytes are buffered, every
+    `flush_interval` seconds, or right away for records at or above
+    `flush_level`. External rotation is checked at most once every
+    `rotation_check_interval` seconds instead of on every record. With
+    `fsync_interval` set, flushes are also synced to disk at most that
+    often (0 syncs on every flush).
+
+    The file is opened in binary mode, so lines that are already `bytes`
+    are written without being decoded and encoded again.
+
+    With a `rotation` policy, the handler also rolls the file over itself,
+    see `speedbeaver.rotation`.
+    """
+
+    def __init__(
+        self,
+        filename: str | os.PathLike,
+        buffer_size: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+        rotation_check_interval: float = 1.0,
+        fsync_interval: float | None = None,
+        encoding: str | None = None,
+        rotation: RotationPolicy | None = None,
+    ):
+        super().__init__(filename, mode="ab")
+        self.text_encoding = encoding or "utf-8"
+        self.rotation = rotation
+        self._rolled_file_worker = (
+            None
+            if rotation is None
+            else RolledFileWorker(self.baseFilename, rotation)
+        )
+        self.buffer: list[bytes] = []
+        self.buffered_size = 0
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.rotation_check_interval = rotation_check_interval
+        self.fsync_interval = fsync_interval
+        self._last_rotation_check = time.monotonic()
+        self._last_fsync = 0.0
+
+        self._stop_flushing = threading.Event()
+        self._flush_thread: threading.Thread | None = None
+        if buffer_size > 0 and flush_interval > 0:
+            self._flush_thread = threading.Thread(
+                target=self._flush_periodically,
+                name="speedbeaver-file-flush",
+                daemon=True,
+            )
+            self._flush_thread.start()
+
+    def _flush_periodically(self):
+        while not self._stop_flushing.wait(self.flush_interval):
+            self.flush()
+
+    def _open(self):
+        stream = super()._open()
+        self._file_size = os.fstat(stream.fileno()).st_size
+        self._opened_at = time.time()
+        return stream
+
+    def rollover(self):
+        """
+        Renames the current file out of the way and starts a new one. The
+        rolled file is compressed and old ones pruned in the background.
+        """
+        assert self.rotation is not None and self._rolled_file_worker
+        if self.stream is not None:
+            self.stream.close()
+        rolled_path = self.rotation.rolled_name(self.baseFilename)
+        os.rename(self.baseFilename, rolled_path)
+        self.stream = self._open()
+        self._statstream()
+        self._rolled_file_worker.submit(rolled_path)
+
+    def reopenIfNeeded(self):
+        now = time.monotonic()
+        if now - self._last_rotation_check < self.rotation_check_interval:
+            return
+        self._last_rotation_check = now
+        super().reopenIfNeeded()
+
+    def emit(self, record):
+        self.emit_rendered(record, self.format(record))
+
+    def emit_rendered(self, record: logging.LogRecord, message: str | bytes):
+        """
+        Writes an already rendered record. `bytes` messages are complete
+        lines, `str` messages get the terminator added.
+        """
+        try:
+            if isinstance(message, str):
+                message += self.terminator
+            self.write(message, record.levelno)
+        except Exception:
+            self.handleError(record)
+
+    def write(self, data: str | bytes, levelno: int = logging.NOTSET):
+        """
+        Buffers already rendered text, applying the same flush rules as
+        records.
+        """
+        if isinstance(data, str):
+            data = data.encode(self.text_encoding)
+        with self.lock:  # type: ignore[union-attr]
+            self.buffer.append(data)
+            self.buffered_size += len(data)
+            if (
+                levelno >= self.flush_level
+                or self.buffered_size >= self.buffer_size
+            ):
+                self.flush()
+
+    def flush(self):
+        with self.lock:  # type: ignore[union-attr]
+            if not self.buffer or self.stream is None:
+                return
+            self.reopenIfNeeded()
+            data = b"".join(self.buffer)
+            if self.rotation is not None and self.rotation.should_rollover(
+                self._file_size, len(data), self._opened_at
+            ):
+                self.rollover()
+            # Opened with mode="ab", whatever FileHandler types it as
+            stream = cast(BinaryIO, self.stream)
+            stream.write(data)
+            stream.flush()
+            self._file_size += len(data)
+            self.buffer.clear()
+            self.buffered_size = 0
+            if self.fsync_interval is not None:
+                now = time.monotonic()
+                if now - self._last_fsync >= self.fsync_interval:
+                    os.fsync(stream.fileno())
+                    self._last_fsync = now
+
+    def close(self):
+        # Not joined: close() may be called with the handler lock held,
+        # which the flush thread could be waiting on.
+        self._stop_flushing.set()
+        self.flush()
+        super().close()
+        if self._rolled_file_worker is not None:
+            self._rolled_file_worker.close()
+
+
+def find_tui_command() -> tuple[list[str], str | None] | None:
+    """
+    Finds the `speedbeaver-tui` binary, or falls back to running it from
+    source with `go run`. Returns the command and working directory.
+    """
+    speedbeaver_dir = os.path.dirname(os.path.dirname(__file__))
+    project_root = os.path.dirname(speedbeaver_dir)
+    tui_binary = os.path.join(project_root, "speedbeaver-tui")
+    if os.path.exists(tui_binary):
+        return [tui_binary], None
+
+    tui_dir = os.path.join(project_root, "go-tui")
+    if os.path.exists(os.path.join(tui_dir, "main.go")):
+        return ["go", "run", "main.go"], tui_dir
+    return None
+
+
+# Only viewers built with `--socket` support carry its usage text
+TUI_SOCKET_FLAG_USAGE = b"listen for logs on this Unix socket"
+
+
+@functools.cache
+def tui_supports_socket(args: tuple[str, ...], cwd: str | None) -> bool:
+    """
+    Whether the viewer that `find_tui_command` found accepts `--socket`.
+    Builds from before the flag don't parse flags at all and would just run
+    as a stdin viewer, so the binary, or the source for `go run`, is
+    searched for the flag rather than run.
+    """
+    path = args[0] if cwd is None else os.path.join(cwd, "main.go")
+    try:
+        with open(path, "rb") as viewer:
+            return TUI_SOCKET_FLAG_USAGE in viewer.read()
+    except OSError:
+        return False
+
+
+class TUIStreamHandler(BackgroundSender[dict[str, Any]], logging.StreamHandler):
+    """
+    Sends records to the `speedbeaver-tui` viewer when it's available, and
+    falls back to the regular stream otherwise.
+
+    Records are queued in a ring buffer of `buffer_size` entries that a
+    writer thread drains, batching everything queued into a single write to
+    the viewer. If the viewer can't keep up, the oldest records are dropped
+    and counted in `dropped`, so a slow terminal never blocks the logging
+    thread. A batch the viewer couldn't take is written to the stream
+    instead, and `close()` returns once everything queued is written.
+
+    By default each handler spawns its own viewer. With `socket_path`, the
+    writer thread instead connects lazily to one viewer listening on that
+    Unix socket, shared by every worker on the host, and starts it if no
+    worker has yet. A viewer without socket support is never started, so
+    records then stay on the stream unless one is started by hand. Records
+    are tagged with the worker's PID.
+
+    After a fork, the child drops what the parent had queued and restarts
+    the writer thread. In socket mode it connects to the shared viewer on
+    its own, while a viewer the parent spawned stays the parent's, and the
+    child writes to the stream.
+    """
+
+    sender_thread_name = "speedbeaver-tui-writer"
+
+    def __init__(
+        self,
+        stream=None,
+        buffer_size: int = 10_000,
+        socket_path: str | None = None,
+        reconnect_interval: float = 5.0,
+    ):
         super().__init__(stream)
-        self.tui_process = None
-        self._try_start_tui()
-    
+        self._init_sender(buffer_size, reconnect_interval)
+        self.tui_process: subprocess.Popen[bytes] | None = None
+        self.socket_path = socket_path
+        self.pipe_failures = 0
+        self._reported_dropped = 0
+        self._sink: IO[bytes] | None = None
+        self._socket: socket.socket | None = None
+        if socket_path is None:
+            self._try_start_tui()
+        else:
+            self._start_sender()
+
     def _try_start_tui(self):
         try:
-            speedbeaver_dir = os.path.dirname(os.path.dirname(__file__))
-            project_root = os.path.dirname(speedbeaver_dir)
-            tui_binary = os.path.join(project_root, "speedbeaver-tui")
-            
-            if os.path.exists(tui_binary):
+            tui_command = find_tui_command()
+            if tui_command is not None:
+                args, cwd = tui_command
                 self.tui_process = subprocess.Popen(
-                    [tui_binary],
-                    stdin=subprocess.PIPE,
-                    text=True,
-                    bufsize=1
+                    args, cwd=cwd, stdin=subprocess.PIPE
                 )
-                return
-                
-            tui_dir = os.path.join(project_root, "go-tui")
-            if os.path.exists(tui_dir) and os.path.exists(os.path.join(tui_dir, "main.go")):
-                self.tui_process = subprocess.Popen(
-                    ["go", "run", "main.go"],
-                    cwd=tui_dir,
-                    stdin=subprocess.PIPE,
-                    text=True,
-                    bufsize=1
+                self._sink = self.tui_process.stdin
+        except Exception:
+            self.tui_process = None
+
+        if self.tui_process is not None:
+            self._start_sender()
+
+    def _connect(self) -> BinaryIO | None:
+        """
+        Connects to the shared viewer, starting it if nobody else has.
+        """
+        assert self.socket_path
+        if not self._connect_due():
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            self._start_shared_viewer()
+            return None
+        self._socket = sock
+        return sock.makefile("wb")
+
+    def _start_shared_viewer(self):
+        assert self.socket_path
+        tui_command = find_tui_command()
+        if tui_command is None or not tui_supports_socket(
+            tuple(tui_command[0]), tui_command[1]
+        ):
+            return
+        args, cwd = tui_command
+        # Left on this process's terminal, the viewer reads its keys from
+        # there. Detached from it, it can't start at all.
+        if start_once(
+            self.socket_path, [*args, "--socket", self.socket_path], cwd=cwd
+        ):
+            # The viewer needs a moment to start listening
+            self._next_connect = time.monotonic() + 0.5
+
+    def _reset_if_forked(self):
+        if self.socket_path is None and self._pid != os.getpid():
+            # Left for the parent to write to and terminate, the child
+            # writes to the stream
+            self.tui_process = None
+            self._sender_thread = None
+        super()._reset_if_forked()
+
+    def _disconnect(self):
+        if self._sink is not None:
+            with contextlib.suppress(Exception):
+                self._sink.close()
+        if self._socket is not None:
+            self._socket.close()
+        self._sink = None
+        self._socket = None
+
+    def _drain(self) -> list[dict[str, Any]]:
+        entries: list[dict[str, Any]] = []
+        if self.dropped != self._reported_dropped:
+            entries.append(
+                {
+                    "timestamp": time.time(),
+                    "level": "WARNING",
+                    "message": (
+                        f"{self.dropped - self._reported_dropped} records "
+                        "dropped, the viewer couldn't keep up"
+                    ),
+                    "logger": "speedbeaver.tui",
+                    "pid": self._pid,
+                }
+            )
+            self._reported_dropped = self.dropped
+        entries.extend(super()._drain())
+        return entries
+
+    def _write_locally(self, entries: list[dict[str, Any]]):
+        if not entries:
+            return
+        self.stream.write(
+            "".join(entry["message"] + self.terminator for entry in entries)
+        )
+        self.stream.flush()
+
+    def _write(self, entries: list[dict[str, Any]]) -> bool:
+        if self._sink is None and self.socket_path is not None:
+            self._sink = self._connect()
+        if self._sink is None:
+            # No shared viewer yet, keep the records visible locally
+            self._write_locally(entries)
+            return True
+        try:
+            self._sink.write(
+                b"".join(
+                    orjson.dumps(
+                        entry, default=str, option=orjson.OPT_APPEND_NEWLINE
+                    )
+                    for entry in entries
                 )
+            )
+            self._sink.flush()
+            return True
         except Exception:
+            self.pipe_failures += 1
+            self._disconnect()
+            return False
+
+    def _send(self, entries: list[dict[str, Any]]) -> bool:
+        if self._write(entries):
+            return True
+        self._write_locally(entries)
+        if self.socket_path is None:
+            # The viewer we spawned is gone, fall back to the stream
             self.tui_process = None
-    
+            self._sender_thread = None
+            self._write_locally(self._drain())
+            return False
+        return True
+
     def emit(self, record):
-        if self.tui_process and self.tui_process.stdin:
-            try:
-                log_data = {
-                    "timestamp": record.created,
-                    "level": record.levelname,
-                    "message": self.format(record),
-                    "logger": record.name,
-                }
-                
-                if hasattr(record, 'request_id'):
-                    log_data["request_id"] = record.request_id
-                
-                json_line = json.dumps(log_data) + "\n"
-                self.tui_process.stdin.write(json_line)
-                self.tui_process.stdin.flush()
+        self._reset_if_forked()
+        if self._sender_thread is None:
+            super().emit(record)
+            return
+        self.emit_rendered(record, self.format(record))
+
+    def emit_rendered(self, record: logging.LogRecord, message: str | bytes):
+        try:
+            if isinstance(message, bytes):
+                message = message.decode().rstrip("\n")
+            self._reset_if_forked()
+            if self._sender_thread is None:
+                self.stream.write(message + self.terminator)
+                self.flush()
                 return
-            except Exception:
-                self.tui_process = None
-        
-        super().emit(record)
-    
+            log_data = {
+                "timestamp": record.created,
+                "level": record.levelname,
+                "message": message,
+                "logger": record.name,
+                "pid": self._pid,
+            }
+            request_id = (
+                record.msg.get("request_id")
+                if isinstance(record.msg, dict)
+                else getattr(record, "request_id", None)
+            )
+            if request_id is not None:
+                log_data["request_id"] = request_id
+            self._enqueue(log_data)
+        except Exception:
+            self.handleError(record)
+
     def close(self):
+        self._stop_sender()
+        # Whatever a stuck writer couldn't hand over
+        self._write_locally(self._drain())
+        self._disconnect()
         if self.tui_process:
-            try:
-                self.tui_process.stdin.close()
+            with contextlib.suppress(Exception):
                 self.tui_process.terminate()
-            except Exception:
-                pass
             self.tui_process = None
         super().close()
 
 
+@runtime_checkable
+class RenderedSink(Protocol):
+    """A handler that can be given records already rendered."""
+
+    def emit_rendered(
+        self, record: logging.LogRecord, message: str | bytes
+    ) -> None: ...
+
+
+_EmitRendered = Callable[[logging.LogRecord, str | bytes], None]
+_BoundSink = tuple[logging.Handler, _EmitRendered]
+
+
+class FanOutHandler(logging.Handler):
+    """
+    Feeds several sinks from one set of processors. Each record runs the
+    shared processors once, is rendered once per distinct `LogOutput`, and
+    the same text goes to every sink with that output. Outputs with no sink
+    interested in a record's level aren't rendered at all.
+
+    Sinks need an `emit_rendered(record, message)` method, like the
+    handlers in this module have. `message` is a `str`, or a complete line
+    in `bytes` for `bytes_native` outputs.
+
+    With `metrics`, every record and every hand-off to a sink is counted
+    there, sinks being labelled by their handler name.
+    """
+
+    def __init__(
+        self,
+        shared_processors: list[Processor],
+        sinks: Sequence[tuple[LogOutput, logging.Handler]],
+        metrics: LoggingMetrics | None = None,
+    ):
+        super().__init__()
+        self.shared_processors = list(shared_processors)
+        self.metrics = metrics
+        self.set_sinks(sinks)
+
+    def set_sinks(self, sinks: Sequence[tuple[LogOutput, logging.Handler]]):
+        """
+        Replaces the sinks. The swap happens under the handler's lock, so
+        each record goes either to all of the old sinks or all of the new
+        ones. Sinks that were dropped are left open.
+        """
+        grouped: dict[LogOutput, list[_BoundSink]] = {}
+        for output, sink in sinks:
+            if not isinstance(sink, RenderedSink):
+                raise TypeError(f"{sink!r} has no emit_rendered() method.")
+            grouped.setdefault(output, []).append((sink, sink.emit_rendered))
+        outputs = [
+            (output.foreign_processors(), output.processors(), output_sinks)
+            for output, output_sinks in grouped.items()
+        ]
+        self.acquire()
+        try:
+            self.sink_outputs = list(sinks)
+            self.sinks = [sink for _, sink in sinks]
+            self.outputs = outputs
+        finally:
+            self.release()
+
+    def _prepare(
+        self, record: logging.LogRecord
+    ) -> tuple[Any, str, dict[str, Any]]:
+        """
+        Does what `ProcessorFormatter.format` does before its own
+        processors, a single time for all outputs.
+        """
+        record = logging.makeLogRecord(record.__dict__)
+        logger = getattr(record, "_logger", None)
+        method_name = getattr(record, "_name", None)
+        msg = record.msg
+        # structlog's wrapper hands its event dict over as the message
+        if (
+            logger is not None
+            and method_name is not None
+            and isinstance(msg, dict)
+        ):
+            event_dict = dict(msg)
+            event_dict["_record"] = record
+            event_dict["_from_structlog"] = True
+            return logger, method_name, event_dict
+
+        method_name = record.levelname.lower()
+        event_dict: Any = {
+            "event": record.getMessage(),
+            "_record": record,
+            "_from_structlog": False,
+        }
+        record.args = ()
+        if record.exc_info:
+            event_dict["exc_info"] = record.exc_info
+        if record.stack_info:
+            event_dict["stack_info"] = record.stack_info
+        for processor in self.shared_processors:
+            event_dict = processor(None, method_name, event_dict)
+        record.exc_text = None
+        record.exc_info = None
+        record.stack_info = None
+        return None, method_name, event_dict
+
+    def emit(self, record):
+        try:
+            if self.metrics is not None:
+                self.metrics.record_event(record.levelname, record.name)
+            prepared: tuple[Any, str, dict[str, Any]] | None = None
+            for foreign_processors, processors, sinks in self.outputs:
+                accepting = [
+                    (sink, emit_rendered)
+                    for sink, emit_rendered in sinks
+                    if (
+                        record.levelno >= sink.level
+                        or self._bypasses_levels(record)
+                    )
+                    and sink.filter(record)
+                ]
+                if not accepting:
+                    continue
+                if prepared is None:
+                    prepared = self._prepare(record)
+                logger, method_name, prepared_dict = prepared
+                # A dict until the renderer ends the chain with str or bytes
+                event_dict: Any = prepared_dict.copy()
+                if not prepared_dict["_from_structlog"]:
+                    for processor in foreign_processors:
+                        event_dict = processor(logger, method_name, event_dict)
+                for processor in processors:
+                    event_dict = processor(logger, method_name, event_dict)
+                message = (
+                    event_dict
+                    if isinstance(event_dict, (str, bytes))
+                    else str(event_dict)
+                )
+                if self.metrics is None:
+                    for sink, emit_rendered in accepting:
+                        self._emit_to(sink, emit_rendered, record, message)
+                    continue
+                size = len(
+                    message if isinstance(message, bytes) else message.encode()
+                )
+                for sink, emit_rendered in accepting:
+                    start = time.perf_counter_ns()
+                    self._emit_to(sink, emit_rendered, record, message)
+                    self.metrics.record_emit(
+                        sink.get_name() or type(sink).__name__,
+                        size,
+                        time.perf_counter_ns() - start,
+                    )
+        except Exception:
+            self.handleError(record)
+
+    @staticmethod
+    def _bypasses_levels(record: logging.LogRecord) -> bool:
+        # Flushed tail buffers and escalated requests get past sink levels
+        return is_replaying() or is_escalated_for(record.levelno)
+
+    @staticmethod
+    def _emit_to(
+        sink: logging.Handler,
+        emit_rendered: _EmitRendered,
+        record: logging.LogRecord,
+        message: str | bytes,
+    ):
+        sink.acquire()
+        try:
+            emit_rendered(record, message)
+        finally:
+            sink.release()
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        super().close()
+
+
 class LogStreamSettings(LogHandlerSettings):
     enabled: bool = True
     colors: bool = True
+    tui_buffer_size: int = 10_000
+    tui_socket: str | None = None
 
-    def handler(self, shared_processors: list[Processor]):
+    def output(self) -> LogOutput:
+        if self.json_logs:
+            return LogOutput(json_logs=True, thread_info=True)
+        return LogOutput(
+            colors=self.colors,
+            fast_console=self.fast_console,
+            thread_info=True,
+        )
+
+    def sink(self) -> logging.Handler | None:
         if not self.enabled:
             return None
-        log_renderer: structlog.types.Processor = structlog.dev.ConsoleRenderer(
-            colors=self.colors
+        handler = TUIStreamHandler(
+            buffer_size=self.tui_buffer_size, socket_path=self.tui_socket
         )
-        if self.json_logs:
-            log_renderer = json_renderer
-            shared_processors += [structlog.processors.format_exc_info]
-
-        formatter = structlog.stdlib.ProcessorFormatter(
-            foreign_pre_chain=shared_processors,
-            processors=[
-                extract_from_record,
-                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                log_renderer,
-            ],
-        )
-        handler = TUIStreamHandler()
-        handler.setFormatter(formatter)
+        handler.set_name("stream")
         handler.setLevel(self.log_level)
         return handler
 
 
 class LogFileSettings(LogHandlerSettings):
     file_name: str | None = None
+    buffer_size: int = 64 * 1024
+    flush_interval_ms: int = 1000
+    flush_level: LogLevel = "ERROR"
+    rotation_check_interval_ms: int = 1000
+    fsync_interval_ms: int | None = None
+    aggregate: bool = False
+    aggregate_socket: str | None = None
+    aggregate_idle_timeout: float = 60.0
+    rotate_bytes: int | None = None
+    rotate_interval_s: float | None = None
+    backup_count: int = 5
+    compression: Compression | None = "gzip"
 
-    def handler(self, shared_processors: list[Processor]):
+    def rotation(self) -> RotationPolicy | None:
+        if self.rotate_bytes is None and self.rotate_interval_s is None:
+            return None
+        return RotationPolicy(
+            max_bytes=self.rotate_bytes,
+            interval=self.rotate_interval_s,
+            backup_count=self.backup_count,
+            compression=self.compression,
+        )
+
+    def sink(self) -> logging.Handler | None:
         if not self.enabled:
             return None
         assert self.file_name
-        log_renderer: structlog.types.Processor = structlog.dev.ConsoleRenderer(
-            colors=False
-        )
-        if self.json_logs:
-            log_renderer = json_renderer
-            shared_processors += [structlog.processors.format_exc_info]
-        formatter = structlog.stdlib.ProcessorFormatter(
-            # These run ONLY on `logging` entries that do NOT originate within
-            # structlog.
-            foreign_pre_chain=shared_processors,
-            # These run on ALL entries after the pre_chain is done.
-            processors=[
-                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                log_renderer,
-            ],
-        )
-        handler = logging.handlers.WatchedFileHandler(filename=self.file_name)
-        handler.setFormatter(formatter)
+        handler: logging.Handler
+        if self.aggregate:
+            handler = self.aggregating_handler(self.file_name)
+        else:
+            handler = BufferedFileHandler(
+                filename=self.file_name,
+                buffer_size=self.buffer_size,
+                flush_interval=self.flush_interval_ms / 1000,
+                flush_level=logging.getLevelName(self.flush_level),
+                rotation_check_interval=self.rotation_check_interval_ms / 1000,
+                fsync_interval=None
+                if self.fsync_interval_ms is None
+                else self.fsync_interval_ms / 1000,
+                rotation=self.rotation(),
+            )
+        handler.set_name("file")
         handler.setLevel(self.log_level)
         return handler
 
+    def aggregating_handler(self, file_name: str) -> logging.Handler:
+        """
+        Ships rendered records to a single writer process that owns
+        `file_name`, for when several worker processes share one file.
+        """
+        # Imported here since the aggregation module builds on this one
+        from speedbeaver.aggregation import AggregatingHandler
+
+        server_args = [
+            "--file",
+            file_name,
+            "--buffer-size",
+            str(self.buffer_size),
+            "--flush-interval-ms",
+            str(self.flush_interval_ms),
+            "--idle-timeout",
+            str(self.aggregate_idle_timeout),
+        ]
+        if self.fsync_interval_ms is not None:
+            server_args += ["--fsync-interval-ms", str(self.fsync_interval_ms)]
+        if self.rotate_bytes is not None:
+            server_args += ["--rotate-bytes", str(self.rotate_bytes)]
+        if self.rotate_interval_s is not None:
+            server_args += ["--rotate-interval-s", str(self.rotate_interval_s)]
+        server_args += [
+            "--backup-count",
+            str(self.backup_count),
+            "--compression",
+            self.compression or "none",
+        ]
+        return AggregatingHandler(
+            socket_path=self.aggregate_socket or f"{file_name}.sock",
+            fallback_file_name=file_name,
+            server_args=server_args,
+        )
+
 
 class LogTestSettings(LogHandlerSettings):
     file_name: str | None = None
 
-    def handler(self, shared_processors: list[Processor]):
+    def output(self) -> LogOutput:
+        # Tests parse the file, so it's always JSON
+        return LogOutput(json_logs=True, bytes_native=True)
+
+    def sink(self) -> logging.Handler | None:
         if not self.enabled:
             return None
         assert self.file_name
-
-        log_renderer: structlog.types.Processor = json_renderer
-        shared_processors += [structlog.processors.format_exc_info]
-        formatter = structlog.stdlib.ProcessorFormatter(
-            # These run ONLY on `logging` entries that do NOT originate within
-            # structlog.
-            foreign_pre_chain=shared_processors,
-            # These run on ALL entries after the pre_chain is done.
-            processors=[
-                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                log_renderer,
-            ],
-        )
-        handler = logging.handlers.WatchedFileHandler(
-            filename=Path(".") / "logs" / self.file_name
+        # Tests read the file right after logging, so nothing is held back
+        handler = BufferedFileHandler(
+            filename=Path(".") / "logs" / self.file_name,
+            buffer_size=0,
+            rotation_check_interval=0,
         )
-        handler.setFormatter(formatter)
+        handler.set_name("test")
         handler.setLevel(self.log_level)
         return handler
@@ -0,0 +1,217 @@
+"""
+Bound logger classes that `LogSettings.configure` installs as structlog's
+`wrapper_class`.
+"""
+
+import functools
+import logging
+from collections.abc import Callable
+from types import CoroutineType
+from typing import Any
+
+import structlog
+
+from speedbeaver.escalation import get_escalated_level, is_escalated_for
+from speedbeaver.processors import METHOD_TO_LEVEL
+from speedbeaver.queue_handler import has_active_listener
+
+
+class AsyncBoundLogger(structlog.stdlib.BoundLogger):
+    """
+    A stdlib `BoundLogger` whose `a*` methods, while `async_handlers` is on,
+    log right away on the event loop rather than in the default thread pool
+    executor. Handing the record over is then just a queue put, with
+    rendering and I/O happening on the listener thread, so this saves a
+    future, a thread handoff and a loop wakeup per event and keeps logging
+    from starving the pool. Without a queue listener the handlers would do
+    their I/O on the loop, so structlog's executor path is kept.
+
+    On the inline path, callsite lookups walk the caller's own stack, so
+    callsite processors need `additional_ignores=INTERNAL_CALLSITE_MODULES`
+    to skip this module's frames. `ProcessorCollectionBuilder` adds them,
+    and `LogSettings` adds them to the adders in a `processor_override`.
+    """
+
+    # Not a coroutine function itself: the executor path returns
+    # structlog's coroutine untouched, which then records the caller of
+    # a*() as the callsite as usual.
+    def _dispatch_to_sync(
+        self,
+        meth: Callable[..., Any],
+        event: str,
+        args: tuple[Any, ...],
+        kw: dict[str, Any],
+    ) -> "CoroutineType[Any, Any, None]":
+        if not has_active_listener():
+            return super()._dispatch_to_sync(meth, event, args, kw)
+        meth(event, *args, **kw)
+        return _done()
+
+
+async def _done() -> None:
+    return None
+
+
+def _nop(self, *args: Any, **kwargs: Any) -> None:
+    return None
+
+
+async def _anop(self, *args: Any, **kwargs: Any) -> None:
+    return None
+
+
+def _log_escalated(
+    self: structlog.stdlib.BoundLogger,
+    level: int,
+    method_name: str,
+    event: str | None,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> None:
+    """
+    structlog's stdlib path, minus the `logging` logger's own level check,
+    which an escalated request gets past.
+    """
+    if method_name == "exception":
+        kwargs.setdefault("exc_info", True)
+    if args:
+        kwargs["positional_args"] = args
+    try:
+        log_args, log_kwargs = self._process_event(method_name, event, kwargs)
+    except structlog.DropEvent:
+        return None
+    if not self._logger.disabled:
+        self._logger._log(level, log_args[0], tuple(log_args[1:]), **log_kwargs)
+    return None
+
+
+def _escalatable(method_name: str, level: int) -> tuple[Any, Any]:
+    """
+    Returns sync and `a*` methods that only log while the current context
+    is escalated to `level`.
+    """
+
+    def method(self, event: str | None = None, *args, **kwargs):
+        # Inlined is_escalated_for(), this runs on every filtered call
+        escalated_level = get_escalated_level()
+        if escalated_level is None or level < escalated_level:
+            return None
+        return _log_escalated(self, level, method_name, event, args, kwargs)
+
+    async def amethod(self, event: str | None = None, *args, **kwargs):
+        escalated_level = get_escalated_level()
+        if escalated_level is None or level < escalated_level:
+            return None
+        # Called directly to keep the caller two frames up, like base.a*
+        await self._dispatch_to_sync(
+            getattr(self, method_name), event, args, kwargs
+        )
+
+    return method, amethod
+
+
+def _level_gated_methods(
+    min_level: int,
+    base: type[structlog.stdlib.BoundLogger],
+    escalation_level: int | None = None,
+) -> dict[str, Any]:
+    methods: dict[str, Any] = {
+        "min_level": min_level,
+        "escalation_level": escalation_level,
+    }
+    for method_name, level in METHOD_TO_LEVEL.items():
+        if level >= min_level:
+            method = getattr(base, method_name)
+            amethod = getattr(base, f"a{method_name}", None)
+        elif escalation_level is not None and level >= escalation_level:
+            method, amethod = _escalatable(method_name, level)
+        else:
+            method, amethod = _nop, _anop
+        methods[method_name] = method
+        if hasattr(base, f"a{method_name}"):
+            methods[f"a{method_name}"] = amethod
+    return methods
+
+
+def _make_filtering_class(
+    name: str, min_level: int, base: type[structlog.stdlib.BoundLogger]
+) -> type[structlog.stdlib.BoundLogger]:
+    namespace = _level_gated_methods(min_level, base)
+
+    def log(self, level: int, event: str | None = None, *args, **kwargs):
+        if level >= self.min_level:
+            return base.log(self, level, event, *args, **kwargs)
+        if self.escalation_level is None or not is_escalated_for(level):
+            return None
+        method_name = logging.getLevelName(level).lower()
+        return _log_escalated(self, level, method_name, event, args, kwargs)
+
+    async def alog(self, level: int, event: str, *args, **kwargs) -> None:
+        if level < self.min_level and not (
+            self.escalation_level is not None and is_escalated_for(level)
+        ):
+            return None
+        # Called directly to keep the caller two frames up, like base.alog
+        await self._dispatch_to_sync(
+            functools.partial(self.log, level), event, args, kwargs
+        )
+
+    def isEnabledFor(self, level: int) -> bool:  # noqa: N802
+        if level >= self.min_level:
+            return base.isEnabledFor(self, level)
+        return self.escalation_level is not None and is_escalated_for(level)
+
+    namespace.update(log=log, alog=alog, isEnabledFor=isEnabledFor)
+    return type(name, (base,), namespace)
+
+
+@functools.cache
+def make_filtering_bound_logger(
+    min_level: int,
+    base: type[structlog.stdlib.BoundLogger] = structlog.stdlib.BoundLogger,
+) -> type[structlog.stdlib.BoundLogger]:
+    """
+    Returns a subclass of `base` whose methods below `min_level`, both sync
+    and `a*`, return right away, before any processor runs or a record is
+    created. Classes are cached per level.
+    """
+    return _make_filtering_class(
+        f"Filtering{base.__name__}{logging.getLevelName(min_level).title()}",
+        min_level,
+        base,
+    )
+
+
+@functools.cache
+def make_adjustable_bound_logger(
+    base: type[structlog.stdlib.BoundLogger] = structlog.stdlib.BoundLogger,
+) -> type[structlog.stdlib.BoundLogger]:
+    """
+    Like `make_filtering_bound_logger`, but there's a single class per
+    `base` whose level `set_min_level` changes in place, so loggers that
+    structlog already cached follow along. It starts out letting
+    everything through.
+    """
+    return _make_filtering_class(
+        f"Adjustable{base.__name__}", logging.NOTSET, base
+    )
+
+
+def set_min_level(
+    logger_class: type[structlog.stdlib.BoundLogger],
+    min_level: int,
+    escalation_level: int | None = None,
+) -> None:
+    """
+    Moves a class from `make_adjustable_bound_logger` to `min_level`. Each
+    method is swapped in a single assignment, so concurrent calls see
+    either the old level or the new one.
+
+    With `escalation_level`, methods from that level up to `min_level`
+    check whether the current context is escalated (see
+    `speedbeaver.escalation`) instead of doing nothing.
+    """
+    base = logger_class.__mro__[1]
+    methods = _level_gated_methods(min_level, base, escalation_level)
+    for name, method in methods.items():
+        setattr(logger_class, name, method)
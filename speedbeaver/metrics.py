@@ -0,0 +1,236 @@
+"""
+Metrics about speedbeaver's own logging pipeline: events per level and
+logger, rendered bytes and emit latency per sink, queue depth, dropped
+events and TUI pipe failures.
+
+Enable them with `LogSettings(metrics=MetricsSettings(enabled=True))` (or
+`METRICS__ENABLED=true`), then read them with `get_metrics()`, or in the
+Prometheus text format with `render_prometheus()`. `quick_configure` also
+serves the latter on `MetricsSettings.path`.
+"""
+
+import logging
+import threading
+import weakref
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import Any
+
+from pydantic.main import BaseModel
+
+# Upper bounds in seconds, from 1us to 100ms
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.000_001,
+    0.000_005,
+    0.000_01,
+    0.000_05,
+    0.000_1,
+    0.000_5,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+)
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram. `counts[i]` holds the observations in bucket
+    `i` only; the last entry is the +Inf bucket.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(
+            [*map(repr, self.buckets), "+Inf"], self.counts, strict=True
+        ):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class LoggingMetrics:
+    """
+    Counters recorded by `FanOutHandler` as records go through it, plus
+    gauges read from the configured handlers whenever metrics are
+    collected.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.events: dict[tuple[str, str], int] = {}
+        self.rendered_bytes: dict[str, int] = {}
+        self.emit_latency: dict[str, Histogram] = {}
+        self._handlers: weakref.WeakSet[logging.Handler] = weakref.WeakSet()
+
+    def set_handlers(self, handlers: Iterable[logging.Handler]) -> None:
+        """
+        Sets the handlers whose `dropped`, `pipe_failures` and queue
+        depth are reported.
+        """
+        self._handlers = weakref.WeakSet(handlers)
+
+    def record_event(self, level: str, logger_name: str) -> None:
+        key = (level, logger_name)
+        with self._lock:
+            self.events[key] = self.events.get(key, 0) + 1
+
+    def record_emit(self, sink: str, size: int, duration_ns: int) -> None:
+        with self._lock:
+            self.rendered_bytes[sink] = self.rendered_bytes.get(sink, 0) + size
+            histogram = self.emit_latency.get(sink)
+            if histogram is None:
+                histogram = self.emit_latency[sink] = Histogram()
+            histogram.observe(duration_ns / 1e9)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.events.clear()
+            self.rendered_bytes.clear()
+            self.emit_latency.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        dropped: dict[str, int] = {}
+        pipe_failures = 0
+        queue_depth = 0
+        for handler in list(self._handlers):
+            name = handler.get_name() or type(handler).__name__
+            handler_dropped = getattr(handler, "dropped", None)
+            if handler_dropped is not None:
+                dropped[name] = dropped.get(name, 0) + handler_dropped
+            pipe_failures += getattr(handler, "pipe_failures", 0)
+            handler_queue = getattr(handler, "queue", None)
+            if handler_queue is not None:
+                queue_depth += handler_queue.qsize()
+
+        with self._lock:
+            events: dict[str, dict[str, int]] = {}
+            for (level, logger_name), count in self.events.items():
+                events.setdefault(logger_name, {})[level] = count
+            return {
+                "events": events,
+                "rendered_bytes": dict(self.rendered_bytes),
+                "emit_latency": {
+                    sink: {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": dict(histogram.cumulative()),
+                    }
+                    for sink, histogram in self.emit_latency.items()
+                },
+                "queue_depth": queue_depth,
+                "dropped": dropped,
+                "tui_pipe_failures": pipe_failures,
+            }
+
+    def render_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP speedbeaver_events_total Log events handled.",
+            "# TYPE speedbeaver_events_total counter",
+        ]
+        for logger_name, levels in snapshot["events"].items():
+            for level, count in levels.items():
+                lines.append(
+                    "speedbeaver_events_total"
+                    f'{{level="{_escape(level)}",'
+                    f'logger="{_escape(logger_name)}"}} {count}'
+                )
+
+        lines += [
+            "# HELP speedbeaver_rendered_bytes_total Rendered output per sink"
+            " (characters for text outputs).",
+            "# TYPE speedbeaver_rendered_bytes_total counter",
+        ]
+        for sink, size in snapshot["rendered_bytes"].items():
+            lines.append(
+                f'speedbeaver_rendered_bytes_total{{sink="{_escape(sink)}"}}'
+                f" {size}"
+            )
+
+        lines += [
+            "# HELP speedbeaver_emit_duration_seconds Time spent handing a"
+            " rendered record to a sink.",
+            "# TYPE speedbeaver_emit_duration_seconds histogram",
+        ]
+        for sink, histogram in snapshot["emit_latency"].items():
+            label = f'sink="{_escape(sink)}"'
+            for bound, cumulative in histogram["buckets"].items():
+                lines.append(
+                    "speedbeaver_emit_duration_seconds_bucket"
+                    f'{{{label},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                "speedbeaver_emit_duration_seconds_sum"
+                f"{{{label}}} {histogram['sum']}"
+            )
+            lines.append(
+                "speedbeaver_emit_duration_seconds_count"
+                f"{{{label}}} {histogram['count']}"
+            )
+
+        lines += [
+            "# HELP speedbeaver_queue_depth Records waiting in the log queue.",
+            "# TYPE speedbeaver_queue_depth gauge",
+            f"speedbeaver_queue_depth {snapshot['queue_depth']}",
+            "# HELP speedbeaver_dropped_events_total Records dropped because"
+            " a queue or buffer was full.",
+            "# TYPE speedbeaver_dropped_events_total counter",
+        ]
+        for source, count in snapshot["dropped"].items():
+            lines.append(
+                "speedbeaver_dropped_events_total"
+                f'{{source="{_escape(source)}"}} {count}'
+            )
+        lines += [
+            "# HELP speedbeaver_tui_pipe_failures_total Failed writes to the"
+            " TUI viewer.",
+            "# TYPE speedbeaver_tui_pipe_failures_total counter",
+            "speedbeaver_tui_pipe_failures_total "
+            f"{snapshot['tui_pipe_failures']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+pipeline_metrics = LoggingMetrics()
+
+
+def get_metrics() -> dict[str, Any]:
+    """
+    Returns a snapshot of the logging pipeline's metrics.
+    """
+    return pipeline_metrics.snapshot()
+
+
+def render_prometheus() -> str:
+    """
+    Returns the logging pipeline's metrics in the Prometheus text format.
+    """
+    return pipeline_metrics.render_prometheus()
+
+
+def reset_metrics() -> None:
+    pipeline_metrics.reset()
+
+
+class MetricsSettings(BaseModel):
+    enabled: bool = False
+    # Where quick_configure serves the metrics, None to not serve them
+    path: str | None = "/logging/metrics"
@@ -1,115 +1,322 @@
+import hmac
 import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
+from uuid import uuid4
 
 import structlog
 from asgi_correlation_id.context import correlation_id
-from asgi_correlation_id.middleware import CorrelationIdMiddleware
-from fastapi.applications import FastAPI
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    RequestResponseEndpoint,
-)
+from asgi_correlation_id.middleware import is_valid_uuid4
+from pydantic import ValidationError
+from starlette.datastructures import URL, Headers, MutableHeaders
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
-from starlette.types import ASGIApp
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from typing_extensions import Unpack
 
 from speedbeaver.config import (
     LogSettings,
     LogSettingsArgs,
 )
+from speedbeaver.escalation import end_escalation, escalate
+from speedbeaver.metrics import render_prometheus
+from speedbeaver.runtime import (
+    LogConfigUpdate,
+    RuntimeControlSettings,
+    get_log_config,
+    update_log_config,
+)
+from speedbeaver.tail_buffer import end_request_buffer, start_request_buffer
 
+if TYPE_CHECKING:
+    # Importing FastAPI itself takes longer than the rest of the package
+    from fastapi.applications import FastAPI
 
-class StructlogMiddleware(BaseHTTPMiddleware):
+
+class StructlogMiddleware:
     """
-    TODO: Add docs
+    Pure ASGI middleware that binds a request ID, times the request, turns
+    uncaught exceptions into a 500 response and writes the access log, all
+    in a single layer.
     """
 
     def __init__(
         self,
         app: ASGIApp,
         configure_logs: bool = True,
+        request_id_header: str = "X-Request-ID",
         **kwargs: Unpack[LogSettingsArgs],
     ):
         """
         Partial credit for this code goes to:
         - nymous (Link: https://gist.github.com/nymous/f138c7f06062b7c43c060bf03759c29e)
         - nkhitrov (Link: https://gist.github.com/nkhitrov/38adbb314f0d35371eba4ffb8f27078f)
+        - asgi-correlation-id (Link: https://github.com/snok/asgi-correlation-id)
         """
+        self.app = app
+        self.request_id_header = request_id_header
 
-        super().__init__(app)
-
+        settings = LogSettings(**kwargs)
+        self.access_policy = settings.access.policy()
+        self.route_stats = settings.access.route_latency_stats()
+        self.tail_buffer = settings.tail_buffer
+        self.debug_escalation = settings.debug_escalation
+        self.escalation_level = settings.escalation_level()
+        self.tail_slow_threshold_ns = (
+            None
+            if settings.tail_buffer.slow_threshold_ms is None
+            else int(settings.tail_buffer.slow_threshold_ms * 1_000_000)
+        )
         if configure_logs:
-            LogSettings(
-                **kwargs
-            ).configure()  # This just configures the logging automatically
+            # This just configures the logging automatically
+            settings.configure()
+
+    def get_request_id(self, scope: Scope) -> str:
+        """
+        Reuses a valid UUID4 request ID from the request headers, or
+        generates a new one. The request headers are updated to match.
+        """
+        headers = MutableHeaders(scope=scope)
+        header_value = headers.get(self.request_id_header)
+        if header_value and is_valid_uuid4(header_value):
+            return header_value
+
+        request_id = uuid4().hex
+        headers[self.request_id_header] = request_id
+        return request_id
+
+    def should_escalate(self, scope: Scope) -> bool:
+        """
+        Whether the request logs from the escalation level up, picked by
+        sampling or by a signed header.
+        """
+        header_value = (
+            Headers(scope=scope).get(self.debug_escalation.header)
+            if self.debug_escalation.secret is not None
+            else None
+        )
+        return self.debug_escalation.should_escalate(header_value)
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self.get_request_id(scope)
+        correlation_id.set(request_id)
         structlog.contextvars.unbind_contextvars("request_id")
-        request_id = correlation_id.get()
         structlog.contextvars.bind_contextvars(request_id=request_id)
 
-        start_time = time.perf_counter_ns()
-        default_error_message = (
-            "Oops, we ran into a problem processing your request. "
-            "Our team is working on fixing it!"
+        escalation_token = (
+            escalate(self.escalation_level)
+            if self.escalation_level is not None and self.should_escalate(scope)
+            else None
         )
-        response = JSONResponse(
-            content={
-                "message": default_error_message,
-                "request_id": request_id,
-            },
-            status_code=500,
+        tail_token = (
+            start_request_buffer(self.tail_buffer.max_size)
+            if self.tail_buffer.enabled
+            else None
         )
+        start_time = time.perf_counter_ns()
+        status_code = 500
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(self.request_id_header, request_id)
+                headers["X-Process-Time"] = str(
+                    (time.perf_counter_ns() - start_time) / 10**9
+                )
+            await send(message)
+
         try:
-            response = await call_next(request)
-        except Exception as e:
-            if issubclass(type(e), KeyboardInterrupt):
-                raise
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if tail_token is not None:
+                # The request's trail goes out before the error itself
+                end_request_buffer(tail_token, flush=True)
+                tail_token = None
             error_logger = structlog.stdlib.get_logger("speedbeaver.error")
             await error_logger.aexception("Uncaught exception")
+            if not response_started:
+                default_error_message = (
+                    "Oops, we ran into a problem processing your request. "
+                    "Our team is working on fixing it!"
+                )
+                response = JSONResponse(
+                    content={
+                        "message": default_error_message,
+                        "request_id": request_id,
+                    },
+                    status_code=500,
+                )
+                await response(scope, receive, send_wrapper)
+            raise
         finally:
             process_time = time.perf_counter_ns() - start_time
-            status_code = response.status_code
-            url = request.url
-            client_host = "unknown"
-            client_port = 0
-            if request.client:
-                client_host = request.client.host
-                client_port = request.client.port
-            http_method = request.method
-            http_version = request.scope["http_version"]
-            # Recreate the Uvicorn access log format,
-            # but add all parameters as structured information
+            if tail_token is not None:
+                end_request_buffer(
+                    tail_token,
+                    flush=status_code >= 500
+                    or (
+                        self.tail_slow_threshold_ns is not None
+                        and process_time >= self.tail_slow_threshold_ns
+                    ),
+                )
+            if self.route_stats is not None:
+                await self.record_route_stats(scope, status_code, process_time)
+            await self.log_access(scope, request_id, status_code, process_time)
+            if escalation_token is not None:
+                end_escalation(escalation_token)
+
+    async def record_route_stats(
+        self, scope: Scope, status_code: int, process_time: int
+    ) -> None:
+        """
+        Adds the request to the per-route latency histograms, keyed by the
+        matched route's template, and logs the summary when one is due.
+        """
+        assert self.route_stats is not None
+        route = scope.get("route")
+        route_template = (
+            getattr(route, "path_format", None)
+            or getattr(route, "path", None)
+            or "<unmatched>"
+        )
+        summary = self.route_stats.record(
+            scope["method"], route_template, status_code, process_time
+        )
+        if summary is not None:
             logger = structlog.stdlib.get_logger("speedbeaver.access")
-            await logger.ainfo(
-                '%s:%s - "%s %s%s HTTP/%s" %s',
-                client_host,
-                client_port,
-                http_method,
-                url.path,
-                f"?{url.query}" if url.query else "",
-                http_version,
-                status_code,
-                http={
-                    "url": str(url),
-                    "status_code": status_code,
-                    "method": http_method,
-                    "request_id": request_id,
-                    "version": http_version,
+            await logger.ainfo("Route latency summary", **summary)
+
+    async def log_access(
+        self,
+        scope: Scope,
+        request_id: str,
+        status_code: int,
+        process_time: int,
+    ) -> None:
+        sample_rate = self.access_policy.sample(
+            scope["path"], status_code, process_time
+        )
+        if sample_rate is None:
+            return
+
+        url = URL(scope=scope)
+        extra = {} if sample_rate == 1.0 else {"sample_rate": sample_rate}
+        client_host = "unknown"
+        client_port = 0
+        if scope.get("client"):
+            client_host, client_port = scope["client"]
+        http_method = scope["method"]
+        http_version = scope["http_version"]
+        # Recreate the Uvicorn access log format,
+        # but add all parameters as structured information
+        logger = structlog.stdlib.get_logger("speedbeaver.access")
+        await logger.ainfo(
+            '%s:%s - "%s %s%s HTTP/%s" %s',
+            client_host,
+            client_port,
+            http_method,
+            url.path,
+            f"?{url.query}" if url.query else "",
+            http_version,
+            status_code,
+            http={
+                "url": str(url),
+                "status_code": status_code,
+                "method": http_method,
+                "request_id": request_id,
+                "version": http_version,
+            },
+            network={"client": {"ip": client_host, "port": client_port}},
+            duration=process_time,
+            **extra,
+        )
+
+
+async def metrics_endpoint(_: Request) -> PlainTextResponse:
+    """
+    Serves the logging pipeline's metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def runtime_control_endpoint(
+    settings: RuntimeControlSettings,
+) -> Callable[[Request], Awaitable[JSONResponse]]:
+    """
+    Returns an endpoint that serves the logging configuration on GET and
+    applies a `LogConfigUpdate` on POST, for requests with the settings'
+    bearer token.
+    """
+
+    async def endpoint(request: Request) -> JSONResponse:
+        expected = (
+            None
+            if settings.token is None
+            else f"Bearer {settings.token.get_secret_value()}"
+        )
+        authorization = request.headers.get("authorization", "")
+        if expected is None or not hmac.compare_digest(
+            authorization.encode(), expected.encode()
+        ):
+            return JSONResponse({"message": "Forbidden"}, status_code=403)
+        if request.method != "POST":
+            return JSONResponse(get_log_config())
+
+        try:
+            update = LogConfigUpdate.model_validate_json(await request.body())
+        except ValidationError as e:
+            return JSONResponse(
+                {
+                    "message": "Invalid update",
+                    "errors": e.errors(
+                        include_url=False, include_context=False
+                    ),
                 },
-                network={"client": {"ip": client_host, "port": client_port}},
-                duration=process_time,
+                status_code=422,
             )
-            response.headers["X-Process-Time"] = str(process_time / 10**9)
-        return response
+        try:
+            state = update_log_config(update)
+        except RuntimeError as e:
+            return JSONResponse({"message": str(e)}, status_code=409)
+        logger = structlog.stdlib.get_logger("speedbeaver.runtime")
+        await logger.awarning(
+            "Logging configuration changed",
+            update=update.model_dump(exclude_unset=True),
+        )
+        return JSONResponse(state)
+
+    return endpoint
 
 
 def quick_configure(
-    app: FastAPI,
+    app: "FastAPI",
     **kwargs: Unpack[LogSettingsArgs],
 ):
-    LogSettings(**kwargs).configure()
+    settings = LogSettings(**kwargs)
+    settings.configure()
+    # The middleware configures again once the app starts, which is a no-op
+    # unless something else was configured in between
     app.add_middleware(StructlogMiddleware, **kwargs)
-    app.add_middleware(CorrelationIdMiddleware)
+    if settings.metrics.enabled and settings.metrics.path:
+        app.add_route(
+            settings.metrics.path, metrics_endpoint, include_in_schema=False
+        )
+    if settings.runtime_control.enabled:
+        app.add_route(
+            settings.runtime_control.path,
+            runtime_control_endpoint(settings.runtime_control),
+            methods=["GET", "POST"],
+            include_in_schema=False,
+        )
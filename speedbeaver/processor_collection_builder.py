@@ -1,8 +1,22 @@
+import logging
 from collections.abc import Collection
 
 import structlog
 from structlog.processors import CallsiteParameter
-from structlog.types import EventDict, Processor
+from structlog.types import Processor
+
+from speedbeaver.common import LogLevel
+from speedbeaver.compiled_pipeline import compile_processors
+from speedbeaver.processors import (
+    CALLSITE_PRESETS,
+    INTERNAL_CALLSITE_MODULES,
+    CachedTimeStamper,
+    CallsitePreset,
+    GatedCallsiteParameterAdder,
+    drop_color_message_key,
+    ignore_internal_frames,
+)
+from speedbeaver.redaction import DEFAULT_SENSITIVE_KEYS, Redactor
 
 
 class ProcessorCollectionBuilder:
@@ -10,9 +24,16 @@ class ProcessorCollectionBuilder:
         self.processors: list[Processor] = [
             structlog.contextvars.merge_contextvars,
             structlog.stdlib.ExtraAdder(),
-            self._drop_color_message_key,
+            drop_color_message_key,
         ]
 
+    def add_processor(
+        self, processor: Processor
+    ) -> "ProcessorCollectionBuilder":
+        # Callsite and stack lookups have to see past speedbeaver's frames
+        self.processors.append(ignore_internal_frames(processor))
+        return self
+
     def add_logger_name(self) -> "ProcessorCollectionBuilder":
         self.processors.append(structlog.stdlib.add_logger_name)
         return self
@@ -28,32 +49,78 @@ class ProcessorCollectionBuilder:
     def add_timestamp(
         self, format: str = "iso"
     ) -> "ProcessorCollectionBuilder":
-        self.processors.append(structlog.processors.TimeStamper(fmt=format))
+        """
+        Adds a timestamp in `format`: `iso`, `unix` or a `strftime` format.
+        """
+        self.processors.append(CachedTimeStamper(fmt=format))
         return self
 
     def add_callsite_parameters(
-        self, override: Collection[CallsiteParameter] | None = None
+        self,
+        override: Collection[CallsiteParameter] | None = None,
+        preset: CallsitePreset = "full",
+        min_level: LogLevel | None = None,
+        logger_names: Collection[str] | None = None,
     ) -> "ProcessorCollectionBuilder":
-        default_callsite_parameters = {
-            structlog.processors.CallsiteParameter.PATHNAME,
-            structlog.processors.CallsiteParameter.FILENAME,
-            structlog.processors.CallsiteParameter.LINENO,
-            structlog.processors.CallsiteParameter.MODULE,
-            structlog.processors.CallsiteParameter.FUNC_NAME,
-            structlog.processors.CallsiteParameter.THREAD,
-            structlog.processors.CallsiteParameter.THREAD_NAME,
-            structlog.processors.CallsiteParameter.PROCESS,
-            structlog.processors.CallsiteParameter.PROCESS_NAME,
-        }
+        """
+        Adds callsite information to events. Walking the stack for this is
+        one of the more expensive processors, so it can be limited to events
+        at or above `min_level` and/or events from `logger_names`. The
+        `light` preset skips the thread and process lookups, and `none` skips
+        callsite capture entirely.
+        """
+        parameters = CALLSITE_PRESETS[preset] if override is None else override
+        if not parameters:
+            return self
+        if min_level is None and not logger_names:
+            self.processors.append(
+                structlog.processors.CallsiteParameterAdder(
+                    parameters, additional_ignores=INTERNAL_CALLSITE_MODULES
+                )
+            )
+            return self
         self.processors.append(
-            structlog.processors.CallsiteParameterAdder(
-                default_callsite_parameters if override is None else override
+            GatedCallsiteParameterAdder(
+                parameters,
+                min_level=None
+                if min_level is None
+                else logging.getLevelName(min_level),
+                logger_names=logger_names,
             )
         )
         return self
 
     def add_stack_info_renderer(self) -> "ProcessorCollectionBuilder":
-        self.processors.append(structlog.processors.StackInfoRenderer())
+        self.processors.append(
+            structlog.processors.StackInfoRenderer(
+                additional_ignores=INTERNAL_CALLSITE_MODULES
+            )
+        )
+        return self
+
+    def add_redaction(
+        self,
+        keys: Collection[str] = DEFAULT_SENSITIVE_KEYS,
+        key_patterns: Collection[str] = (),
+        value_patterns: Collection[str] = (),
+        replacement: str = "[REDACTED]",
+        value_fields: Collection[str] | None = None,
+    ) -> "ProcessorCollectionBuilder":
+        """
+        Replaces the values of sensitive keys at any depth, and the parts
+        of strings matching `value_patterns`, in `value_fields` or all
+        fields, see `speedbeaver.redaction`. Add it after the processors
+        that bring in data, so it sees everything that gets rendered.
+        """
+        self.processors.append(
+            Redactor(
+                keys,
+                key_patterns,
+                value_patterns,
+                replacement,
+                value_fields=value_fields,
+            )
+        )
         return self
 
     def add_exception_info(self) -> "ProcessorCollectionBuilder":
@@ -77,15 +144,13 @@ class ProcessorCollectionBuilder:
         #     )
         # self.processors.append(add_open_telemetry_spans)
 
-    def _drop_color_message_key(
-        self, _, __, event_dict: EventDict
-    ) -> EventDict:
-        """
-        Uvicorn logs the message a second time in the extra `color_message`, but we don't
-        need it. This processor drops the key from the event dict if it exists.
-        """
-        event_dict.pop("color_message", None)
-        return event_dict
-
     def get_processors(self) -> list[Processor]:
         return self.processors
+
+    def compile(self) -> Processor:
+        """
+        Fuses the processors collected so far into a single processor, see
+        `speedbeaver.compiled_pipeline`. Processors added afterwards are not
+        included.
+        """
+        return compile_processors(self.processors)
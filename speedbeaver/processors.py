@@ -0,0 +1,233 @@
+import logging
+import time
+from collections.abc import Collection
+from typing import Literal
+
+from structlog.processors import (
+    CallsiteParameter,
+    CallsiteParameterAdder,
+    StackInfoRenderer,
+)
+from structlog.types import EventDict, Processor, WrappedLogger
+
+CallsitePreset = Literal["full"] | Literal["light"] | Literal["none"]
+
+CALLSITE_PRESETS: dict[CallsitePreset, frozenset[CallsiteParameter]] = {
+    "full": frozenset(
+        {
+            CallsiteParameter.PATHNAME,
+            CallsiteParameter.FILENAME,
+            CallsiteParameter.LINENO,
+            CallsiteParameter.MODULE,
+            CallsiteParameter.FUNC_NAME,
+            CallsiteParameter.THREAD,
+            CallsiteParameter.THREAD_NAME,
+            CallsiteParameter.PROCESS,
+            CallsiteParameter.PROCESS_NAME,
+        }
+    ),
+    # Skips the thread and process lookups
+    "light": frozenset(
+        {
+            CallsiteParameter.PATHNAME,
+            CallsiteParameter.FILENAME,
+            CallsiteParameter.LINENO,
+            CallsiteParameter.MODULE,
+            CallsiteParameter.FUNC_NAME,
+        }
+    ),
+    "none": frozenset(),
+}
+
+METHOD_TO_LEVEL: dict[str, int] = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+    "fatal": logging.CRITICAL,
+}
+
+
+def drop_color_message_key(
+    _: WrappedLogger, __: str, event_dict: EventDict
+) -> EventDict:
+    """
+    Uvicorn logs the message a second time in the extra `color_message`, but
+    we don't need it. This processor drops the key from the event dict if it
+    exists.
+    """
+    event_dict.pop("color_message", None)
+    return event_dict
+
+
+def get_logger_name(logger: WrappedLogger, event_dict: EventDict) -> str:
+    """
+    Finds the name of the logger an event came from, for both structlog
+    events and foreign `logging` records.
+    """
+    record: logging.LogRecord | None = event_dict.get("_record")
+    if record is not None:
+        return record.name
+    return getattr(logger, "name", "")
+
+
+# speedbeaver's own frames that sit between the app's call and the
+# processors, which callsite lookups have to skip
+INTERNAL_CALLSITE_MODULES = [
+    "speedbeaver.compiled_pipeline",
+    "speedbeaver.loggers",
+]
+
+
+def ignore_internal_frames(processor: Processor) -> Processor:
+    """
+    Makes a `CallsiteParameterAdder` or `StackInfoRenderer` built outside
+    speedbeaver skip `INTERNAL_CALLSITE_MODULES` too, in place. Anything
+    else is returned as is.
+    """
+    # structlog only takes the ignores in the constructor, so they're
+    # extended on its private attribute when it's there
+    if not isinstance(
+        processor, (CallsiteParameterAdder, StackInfoRenderer)
+    ) or not hasattr(processor, "_additional_ignores"):
+        return processor
+    ignores = processor._additional_ignores or []
+    processor._additional_ignores = [
+        *ignores,
+        *(
+            module
+            for module in INTERNAL_CALLSITE_MODULES
+            if module not in ignores
+        ),
+    ]
+    return processor
+
+
+class GatedCallsiteParameterAdder(CallsiteParameterAdder):
+    """
+    A `CallsiteParameterAdder` that only walks the stack for events at or
+    above `min_level`, or from one of `logger_names` (including their
+    children). Other events pass through untouched.
+    """
+
+    def __init__(
+        self,
+        parameters: Collection[CallsiteParameter] = CALLSITE_PRESETS["full"],
+        min_level: int | None = None,
+        logger_names: Collection[str] | None = None,
+        additional_ignores: list[str] | None = None,
+    ) -> None:
+        super().__init__(
+            parameters,
+            [*INTERNAL_CALLSITE_MODULES, *(additional_ignores or [])],
+        )
+        self.min_level = min_level
+        self.logger_names = frozenset(logger_names or ())
+        self._logger_prefixes = tuple(
+            f"{logger_name}." for logger_name in self.logger_names
+        )
+
+    def _should_capture(
+        self, logger: WrappedLogger, name: str, event_dict: EventDict
+    ) -> bool:
+        if self.min_level is None and not self.logger_names:
+            return True
+        if (
+            self.min_level is not None
+            and METHOD_TO_LEVEL.get(name, logging.CRITICAL) >= self.min_level
+        ):
+            return True
+        if not self.logger_names:
+            return False
+        logger_name = get_logger_name(logger, event_dict)
+        return logger_name in self.logger_names or logger_name.startswith(
+            self._logger_prefixes
+        )
+
+    def __call__(
+        self, logger: WrappedLogger, name: str, event_dict: EventDict
+    ) -> EventDict:
+        if not self._should_capture(logger, name, event_dict):
+            return event_dict
+        return super().__call__(logger, name, event_dict)
+
+
+class CachedTimeStamper:
+    """
+    A faster `TimeStamper` with the same output. The part of the timestamp
+    that only changes once a second is formatted once and cached, so each
+    event just adds its fraction of a second. Foreign `logging` records
+    reuse the time they were created at instead of reading the clock again.
+
+    `fmt` is `"iso"` (in any case), None for a float, or a `strftime`
+    format, where `%f` stands for microseconds like it does for `datetime`.
+    `"unix"` is accepted for None. As with `TimeStamper`, ISO timestamps
+    leave out microseconds when there are none, and `strftime` formats are
+    in local time, `utc` only applying to ISO timestamps.
+    """
+
+    def __init__(
+        self, fmt: str | None = "iso", utc: bool = True, key: str = "timestamp"
+    ):
+        if fmt == "unix":
+            fmt = None
+        if fmt is None and not utc:
+            raise ValueError("UNIX timestamps are always UTC.")
+        self.fmt = fmt
+        self.utc = utc
+        self.key = key
+        self._iso = fmt is not None and fmt.upper() == "ISO"
+        self._to_struct_time = (
+            time.gmtime if self._iso and utc else time.localtime
+        )
+        self._cache: tuple[int, list[str]] = (-1, [])
+
+        self._parts: list[str] | None
+        if fmt is None:
+            self._parts = None
+        elif self._iso:
+            self._parts = ["%Y-%m-%dT%H:%M:%S", "Z" if utc else ""]
+        elif "%%" in fmt:
+            # A literal "%%f" can't be told apart from "%f" by splitting
+            self._parts = [fmt]
+        else:
+            self._parts = fmt.split("%f")
+
+    def _format_parts(self, second: int) -> list[str]:
+        second_cached, parts = self._cache
+        if second_cached != second:
+            assert self._parts is not None
+            struct_time = self._to_struct_time(second)
+            parts = [time.strftime(part, struct_time) for part in self._parts]
+            self._cache = (second, parts)
+        return parts
+
+    def __call__(
+        self, logger: WrappedLogger, name: str, event_dict: EventDict
+    ) -> EventDict:
+        record: logging.LogRecord | None = event_dict.get("_record")
+        now = time.time() if record is None else record.created
+        if self._parts is None:
+            event_dict[self.key] = now
+            return event_dict
+
+        second = int(now)
+        # Rounded half to even, like `datetime` does
+        microsecond = round((now - second) * 1_000_000)
+        if microsecond == 1_000_000:
+            second += 1
+            microsecond = 0
+        parts = self._format_parts(second)
+        if self._iso:
+            if microsecond:
+                event_dict[self.key] = f"{parts[0]}.{microsecond:06d}{parts[1]}"
+            else:
+                event_dict[self.key] = parts[0] + parts[1]
+        elif len(parts) == 1:
+            event_dict[self.key] = parts[0]
+        else:
+            event_dict[self.key] = f"{microsecond:06d}".join(parts)
+        return event_dict
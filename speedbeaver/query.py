@@ -0,0 +1,368 @@
+"""
+Fast lookups in JSON log files.
+
+`LogFile` memory-maps a JSON log file and keeps a sidecar index next to it
+(`app.log.idx`) with each line's offset, level, timestamp and a hash of
+its `request_id`. The index is append-only: opening or refreshing a file
+only parses the lines written since the last time. Finding one request's
+lines then reads and parses just those lines.
+
+    with LogFile("logs/app.log") as log_file:
+        for line in log_file.lines(request_id=request_id):
+            ...
+
+The same is available from the command line with
+`python -m speedbeaver.query FILE --request-id ID`.
+"""
+
+import argparse
+import functools
+import hashlib
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from types import TracebackType
+from typing import Any
+
+import orjson
+
+INDEX_MAGIC = b"SBIDX001"
+# Magic, then a hash of the log's first line to notice it being replaced
+INDEX_HEADER = struct.Struct("<8sQ")
+# Offset, length, level, timestamp (NaN if unknown), request ID hash
+INDEX_ENTRY = struct.Struct("<QIBdQ")
+
+IndexEntry = tuple[int, int, int, float, int]
+
+
+# Request IDs repeat on every line of a request
+@functools.lru_cache(maxsize=8192)
+def _hash(value: str | bytes) -> int:
+    if isinstance(value, str):
+        value = value.encode()
+    digest = hashlib.blake2b(value, digest_size=8).digest()
+    # 0 stands for "no request ID"
+    return int.from_bytes(digest, "little") or 1
+
+
+@functools.lru_cache(maxsize=64)
+def _level(value: str) -> int:
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else 0
+
+
+@functools.lru_cache(maxsize=1024)
+def _whole_second_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+_FRACTION = re.compile(r"\.\d+")
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return math.nan
+    # Parses "2025-01-02T03:04:05" plus the zone once per second, and adds
+    # the fraction on top
+    try:
+        fraction = _FRACTION.match(value, 19)
+        if fraction is None:
+            return _whole_second_timestamp(value)
+        return _whole_second_timestamp(
+            value[:19] + value[fraction.end() :]
+        ) + float(fraction.group())
+    except ValueError:
+        return math.nan
+
+
+class IndexEntries:
+    """
+    A log file's index entries, kept as one array per `INDEX_ENTRY` field
+    rather than a tuple per line. Indexing returns an entry's fields as a
+    tuple.
+    """
+
+    def __init__(self) -> None:
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.levels = array("B")
+        self.timestamps = array("d")
+        self.request_id_hashes = array("Q")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, position: int) -> IndexEntry:
+        return (
+            self.offsets[position],
+            self.lengths[position],
+            self.levels[position],
+            self.timestamps[position],
+            self.request_id_hashes[position],
+        )
+
+    def extend(self, entries: Iterable[IndexEntry]) -> None:
+        add_offset = self.offsets.append
+        add_length = self.lengths.append
+        add_level = self.levels.append
+        add_timestamp = self.timestamps.append
+        add_request_id_hash = self.request_id_hashes.append
+        for offset, length, level, timestamp, request_id_hash in entries:
+            add_offset(offset)
+            add_length(length)
+            add_level(level)
+            add_timestamp(timestamp)
+            add_request_id_hash(request_id_hash)
+
+    def clear(self) -> None:
+        for column in (
+            self.offsets,
+            self.lengths,
+            self.levels,
+            self.timestamps,
+            self.request_id_hashes,
+        ):
+            del column[:]
+
+
+class LogFile:
+    """
+    A JSON log file and its sidecar index. Call `refresh()` to pick up
+    lines written since the file was opened.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        index_path: str | os.PathLike | None = None,
+    ):
+        self.path = os.fspath(path)
+        self.index_path = (
+            os.fspath(index_path) if index_path else f"{self.path}.idx"
+        )
+        self.entries = IndexEntries()
+        # Positions in `entries`, per request ID hash
+        self._by_request_id: dict[int, array[int]] = {}
+        self._indexed_size = 0
+        self._file = open(self.path, "rb")  # noqa: SIM115
+        self._map: mmap.mmap | None = None
+        self._load_index()
+        self.refresh()
+
+    def __enter__(self) -> "LogFile":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _first_line_hash(self) -> int:
+        self._file.seek(0)
+        return _hash(self._file.readline())
+
+    def _add_entries(self, entries: Iterable[IndexEntry]) -> None:
+        by_request_id = self._by_request_id
+        start = len(self.entries)
+        self.entries.extend(entries)
+        request_id_hashes = self.entries.request_id_hashes
+        for position in range(start, len(request_id_hashes)):
+            request_id_hash = request_id_hashes[position]
+            if request_id_hash:
+                positions = by_request_id.get(request_id_hash)
+                if positions is None:
+                    positions = by_request_id[request_id_hash] = array("Q")
+                positions.append(position)
+        if self.entries:
+            offset, length = self.entries[-1][:2]
+            # Past the line's newline
+            self._indexed_size = offset + length + 1
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, "rb") as index_file:
+                data = index_file.read()
+        except FileNotFoundError:
+            return
+        if len(data) < INDEX_HEADER.size:
+            return
+        magic, first_line_hash = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or first_line_hash != self._first_line_hash():
+            return
+        # Ignores a partially written last entry
+        end = (
+            INDEX_HEADER.size
+            + (len(data) - INDEX_HEADER.size)
+            // INDEX_ENTRY.size
+            * INDEX_ENTRY.size
+        )
+        self._add_entries(
+            INDEX_ENTRY.iter_unpack(data[INDEX_HEADER.size : end])
+        )
+        if self._indexed_size > os.fstat(self._file.fileno()).st_size:
+            # The log was truncated, start over
+            self.entries.clear()
+            self._by_request_id.clear()
+            self._indexed_size = 0
+
+    def refresh(self) -> int:
+        """
+        Indexes the complete lines written since the last refresh and
+        returns how many there were.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            return 0
+        if self._map is None or len(self._map) != size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(
+                self._file.fileno(), size, access=mmap.ACCESS_READ
+            )
+        if self._indexed_size >= size:
+            return 0
+
+        new_entries = []
+        offset = self._indexed_size
+        while True:
+            end = self._map.find(b"\n", offset)
+            if end == -1:
+                # The last line is still being written
+                break
+            new_entries.append(self._index_line(offset, end - offset))
+            offset = end + 1
+        if not new_entries:
+            return 0
+
+        if not self.entries:
+            header = INDEX_HEADER.pack(INDEX_MAGIC, self._first_line_hash())
+            mode = "wb"
+        else:
+            header, mode = b"", "ab"
+        with open(self.index_path, mode) as index_file:
+            index_file.write(
+                header
+                + b"".join(INDEX_ENTRY.pack(*entry) for entry in new_entries)
+            )
+        self._add_entries(new_entries)
+        return len(new_entries)
+
+    def _index_line(self, offset: int, length: int) -> IndexEntry:
+        assert self._map is not None
+        try:
+            line = orjson.loads(self._map[offset : offset + length])
+        except orjson.JSONDecodeError:
+            line = None
+        if not isinstance(line, dict):
+            return offset, length, 0, math.nan, 0
+        level = line.get("level")
+        request_id = line.get("request_id")
+        return (
+            offset,
+            length,
+            _level(level) if isinstance(level, str) else 0,
+            _timestamp(line.get("timestamp")),
+            _hash(request_id) if isinstance(request_id, str) else 0,
+        )
+
+    def lines(
+        self,
+        request_id: str | None = None,
+        min_level: str | int | None = None,
+        since: datetime | float | None = None,
+        until: datetime | float | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yields the decoded lines matching every given filter, in file
+        order. Only matching lines are read and parsed. Lines without a
+        timestamp never match `since` or `until`.
+        """
+        assert self._map is not None or not self.entries
+        if isinstance(min_level, str):
+            min_level = _level(min_level)
+        since_ts = since.timestamp() if isinstance(since, datetime) else since
+        until_ts = until.timestamp() if isinstance(until, datetime) else until
+
+        positions: Iterable[int]
+        if request_id is not None:
+            positions = self._by_request_id.get(_hash(request_id), ())
+        else:
+            positions = range(len(self.entries))
+
+        # Only the columns a filter needs are read for lines that don't match
+        levels = self.entries.levels
+        timestamps = self.entries.timestamps
+        for position in positions:
+            if min_level is not None and levels[position] < min_level:
+                continue
+            if since_ts is not None and not timestamps[position] >= since_ts:
+                continue
+            if until_ts is not None and not timestamps[position] < until_ts:
+                continue
+            offset = self.entries.offsets[position]
+            length = self.entries.lengths[position]
+            # Looked up each time, refresh() may have remapped the file
+            log_map = self._map
+            assert log_map is not None
+            try:
+                line = orjson.loads(log_map[offset : offset + length])
+            except orjson.JSONDecodeError:
+                continue
+            if not isinstance(line, dict):
+                continue
+            if request_id is not None and line.get("request_id") != request_id:
+                # A hash collision
+                continue
+            yield line
+
+    def request(self, request_id: str) -> list[dict[str, Any]]:
+        """
+        Returns every line logged for `request_id`.
+        """
+        return list(self.lines(request_id=request_id))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m speedbeaver.query",
+        description="Filter a JSON log file using its sidecar index.",
+    )
+    parser.add_argument("file")
+    parser.add_argument("--request-id", default=None)
+    parser.add_argument("--min-level", default=None)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    with LogFile(args.file) as log_file:
+        for line in log_file.lines(
+            request_id=args.request_id,
+            min_level=args.min_level,
+            since=args.since,
+            until=args.until,
+        ):
+            sys.stdout.buffer.write(
+                orjson.dumps(line, option=orjson.OPT_APPEND_NEWLINE)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+from typing import Literal
+
+from pydantic.main import BaseModel
+
+from speedbeaver.common import resolve_exc_info
+
+OverflowPolicy = (
+    Literal["block"] | Literal["drop_newest"] | Literal["drop_oldest"]
+)
+
+
+class SpeedbeaverQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them, so that all rendering and I/O
+    happens on the listener thread instead of the calling thread.
+    """
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[logging.LogRecord | None]",
+        overflow: OverflowPolicy = "block",
+    ):
+        super().__init__(log_queue)
+        # `self.queue` is only typed as what QueueHandler itself needs
+        self.log_queue = log_queue
+        self.overflow: OverflowPolicy = overflow
+        self.dropped = 0
+        self.listener: SpeedbeaverQueueListener | None = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The exception being handled is only known on this thread
+        resolve_exc_info(record)
+        # Foreign records run the shared processors (including
+        # merge_contextvars) on the listener thread, so we carry the
+        # caller's context along with the record.
+        context = contextvars.copy_context()
+        record._speedbeaver_context = context  # type: ignore[attr-defined]
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.log_queue.put(record)
+            return
+        try:
+            self.log_queue.put_nowait(record)
+            return
+        except queue.Full:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return
+        # drop_oldest: make room by discarding the record at the head
+        while True:
+            try:
+                oldest = self.log_queue.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                self.dropped += 1
+                if oldest is None:
+                    # The listener's stop sentinel has to stay queued. The
+                    # listener is stopping, so this record is dropped.
+                    self.log_queue.put(oldest)
+                    return
+            try:
+                self.log_queue.put_nowait(record)
+                return
+            except queue.Full:
+                continue
+
+
+class SpeedbeaverQueueListener(logging.handlers.QueueListener):
+    def __init__(
+        self,
+        log_queue: "queue.Queue[logging.LogRecord | None]",
+        *handlers: logging.Handler,
+    ):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+
+    def handle(self, record: logging.LogRecord) -> None:
+        # Popped so that ExtraAdder doesn't pick it up as an extra
+        context: contextvars.Context | None = record.__dict__.pop(
+            "_speedbeaver_context", None
+        )
+        if context is None:
+            super().handle(record)
+            return
+        context.run(super().handle, record)
+
+    def enqueue_sentinel(self) -> None:
+        # The default uses put_nowait, which fails on a full bounded queue.
+        self.queue.put(self._sentinel)  # type: ignore[arg-type]
+
+    def stop(self) -> None:
+        if self._thread is None:  # type: ignore[attr-defined]
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+            handler.close()
+
+
+_active_listener: SpeedbeaverQueueListener | None = None
+
+
+def set_active_listener(listener: SpeedbeaverQueueListener | None) -> None:
+    """
+    Makes the given listener the active one. The previously active listener,
+    if any, drains its queue and is stopped.
+    """
+    global _active_listener
+    previous, _active_listener = _active_listener, listener
+    if previous is not None and previous is not listener:
+        previous.stop()
+
+
+def has_active_listener() -> bool:
+    """
+    Whether records are currently handed over to a listener thread.
+    """
+    return _active_listener is not None
+
+
+def stop_listener() -> None:
+    """
+    Drains any queued records, then stops the active listener thread.
+    """
+    set_active_listener(None)
+
+
+atexit.register(stop_listener)
+
+
+class LogQueueSettings(BaseModel):
+    max_size: int = 10_000
+    overflow: OverflowPolicy = "block"
+
+    def handler(self, handlers: list[logging.Handler]):
+        """
+        Puts the given handlers behind a bounded queue drained by a
+        background listener thread. The listener is started right away and
+        is available as `handler.listener`.
+        """
+        if not handlers:
+            return None
+
+        log_queue: queue.Queue[logging.LogRecord | None] = queue.Queue(
+            maxsize=self.max_size
+        )
+        handler = SpeedbeaverQueueHandler(log_queue, overflow=self.overflow)
+        handler.set_name("queue")
+        handler.setLevel(min(_handler.level for _handler in handlers))
+        handler.listener = SpeedbeaverQueueListener(log_queue, *handlers)
+        handler.listener.start()
+        return handler
@@ -0,0 +1,281 @@
+"""
+Redaction of sensitive fields.
+
+`Redactor` replaces the values of sensitive keys, at any depth, and the
+parts of strings that match sensitive value patterns. Its rules are
+compiled once into a key lookup (decisions are cached per key, so a key
+is only classified the first time it's seen) and a single regex for all
+value patterns.
+
+Most strings can't match any of the built-in value patterns, as each
+match needs a literal, like the `=` of a query parameter. Strings without
+any of those skip the regex. Custom patterns don't have one, so with any
+of them every string is scanned.
+
+Events whose keys have all been seen before and found harmless skip the
+per-key lookups, with one set comparison for the whole event, and only
+their nested containers are looked into, and so are nested dicts. Scanning
+every string for value patterns costs far more than that, so they can be
+limited with `value_fields` to the top-level fields that may hold such
+values.
+
+Nested dicts, lists and tuples are copied only along the path to
+something that was redacted, so values shared with the caller, like
+bound context, are never changed.
+"""
+
+import re
+from collections.abc import Collection, Mapping
+from typing import Any
+
+from pydantic.main import BaseModel
+from structlog.types import EventDict, WrappedLogger
+
+# Compared after lowercasing and dropping everything but letters and
+# digits, so "api_key", "apiKey" and "X-Api-Key" all match "apikey"
+DEFAULT_SENSITIVE_KEYS = (
+    "password",
+    "passwd",
+    "secret",
+    "clientsecret",
+    "token",
+    "accesstoken",
+    "refreshtoken",
+    "idtoken",
+    "apikey",
+    "xapikey",
+    "authorization",
+    "proxyauthorization",
+    "cookie",
+    "setcookie",
+    "privatekey",
+)
+
+# Named value patterns that can be used in place of a regex. Patterns are
+# combined into one, so flags have to be scoped, as in `(?i:...)`. What a
+# pattern's first group matched is kept, so the text that leads up to a
+# secret isn't replaced along with it. Look-behinds would do the same, but
+# are tried at every position of every string.
+VALUE_PATTERNS = {
+    "bearer": r"((?i:bearer) )[A-Za-z0-9._~+/-]+=*",
+    "jwt": r"\beyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+",
+    "url_credentials": r"(://)[^/\s:@]+:[^/\s@]+(?=@)",
+    "query_secrets": (
+        r"((?i:[?&](?:token|access_token|api_key|apikey|key|password|secret)=))"
+        r"[^&#\s]+"
+    ),
+}
+# Lowercase text that every match of a named pattern contains
+VALUE_PATTERN_HINTS = {
+    "bearer": "bearer ",
+    "jwt": "eyj",
+    "url_credentials": "://",
+    "query_secrets": "=",
+}
+
+_NORMALIZE = re.compile(r"[^a-z0-9]")
+# Unchanged values are reported with this rather than copied
+_UNCHANGED: Any = object()
+# Values that can't hold anything to redact
+_SCALARS = frozenset((int, float, bool, type(None)))
+# Key decisions are forgotten past this many distinct keys
+MAX_CACHED_KEYS = 4096
+
+
+class Redactor:
+    """
+    A processor that redacts sensitive data, see the module docstring.
+
+    `keys` are matched after normalization, `key_patterns` are regexes
+    searched for in the key as is (case-insensitively), and
+    `value_patterns` are regexes, or names from `VALUE_PATTERNS`, whose
+    matches inside string values are replaced, apart from what their first
+    group matched. With `value_fields`, they are only applied to those
+    top-level fields (and whatever is nested in them) rather than to every
+    string. Containers deeper than `max_depth` are left alone.
+    """
+
+    def __init__(
+        self,
+        keys: Collection[str] = DEFAULT_SENSITIVE_KEYS,
+        key_patterns: Collection[str] = (),
+        value_patterns: Collection[str] = (),
+        replacement: str = "[REDACTED]",
+        max_depth: int = 8,
+        value_fields: Collection[str] | None = None,
+    ):
+        self.keys = frozenset(_NORMALIZE.sub("", key.lower()) for key in keys)
+        self.key_pattern = (
+            re.compile("|".join(f"(?:{p})" for p in key_patterns), re.I)
+            if key_patterns
+            else None
+        )
+        self.value_pattern: re.Pattern[str] | None = None
+        # The first group of each pattern that has one, by the index of the
+        # group wrapped around the pattern, which tells which one matched
+        self._kept_groups: dict[int, int] = {}
+        # Strings without any of these can't match, None if unknown
+        self._value_hints: tuple[str, ...] | None = None
+        if value_patterns:
+            regexes = []
+            group = 1
+            for pattern in value_patterns:
+                regex = VALUE_PATTERNS.get(pattern, pattern)
+                inner_groups = re.compile(regex).groups
+                if inner_groups:
+                    self._kept_groups[group] = group + 1
+                regexes.append(regex)
+                group += inner_groups + 1
+            self.value_pattern = re.compile(
+                "|".join(f"({regex})" for regex in regexes)
+            )
+            if all(
+                pattern in VALUE_PATTERN_HINTS for pattern in value_patterns
+            ):
+                self._value_hints = tuple(
+                    {VALUE_PATTERN_HINTS[pattern] for pattern in value_patterns}
+                )
+        self.replacement = replacement
+        self.max_depth = max_depth
+        scan_all = self.value_pattern is not None and value_fields is None
+        # Top-level fields whose strings are scanned on top of the rest
+        self.value_fields = frozenset(
+            value_fields
+            if self.value_pattern is not None and value_fields
+            else ()
+        )
+        # Values of these classes are skipped without a call
+        self._skipped = _SCALARS if scan_all else _SCALARS | {str}
+        self._key_cache: dict[Any, bool] = {}
+        # The keys in `_key_cache` that aren't sensitive
+        self._harmless_keys: set[Any] = set()
+
+    def _classify_key(self, key: Any) -> bool:
+        text = key if isinstance(key, str) else str(key)
+        sensitive = _NORMALIZE.sub("", text.lower()) in self.keys or (
+            self.key_pattern is not None
+            and self.key_pattern.search(text) is not None
+        )
+        if len(self._key_cache) >= MAX_CACHED_KEYS:
+            self._key_cache.clear()
+            self._harmless_keys.clear()
+        self._key_cache[key] = sensitive
+        if not sensitive:
+            self._harmless_keys.add(key)
+        return sensitive
+
+    def _replace(self, match: re.Match[str]) -> str:
+        # The group wrapped around the pattern that matched closes last
+        kept = self._kept_groups.get(match.lastindex or 0)
+        if kept is None:
+            return self.replacement
+        return match.group(kept) + self.replacement
+
+    def _redact(self, value: Any, depth: int, skipped: frozenset[type]) -> Any:
+        if isinstance(value, str):
+            if self.value_pattern is None:
+                return _UNCHANGED
+            hints = self._value_hints
+            if hints is not None:
+                lowered = value.lower()
+                for hint in hints:
+                    if hint in lowered:
+                        break
+                else:
+                    return _UNCHANGED
+            redacted = self.value_pattern.sub(self._replace, value)
+            return _UNCHANGED if redacted == value else redacted
+        if depth >= self.max_depth:
+            return _UNCHANGED
+        if isinstance(value, dict):
+            return self._redact_dict(value, depth + 1, skipped)
+        if isinstance(value, (list, tuple)):
+            copied: list[Any] | None = None
+            for index, item in enumerate(value):
+                if item.__class__ in skipped:
+                    continue
+                redacted = self._redact(item, depth + 1, skipped)
+                if redacted is _UNCHANGED:
+                    continue
+                if copied is None:
+                    copied = list(value)
+                copied[index] = redacted
+            if copied is None:
+                return _UNCHANGED
+            return copied if isinstance(value, list) else tuple(copied)
+        return _UNCHANGED
+
+    def _redact_dict(
+        self, mapping: Mapping[Any, Any], depth: int, skipped: frozenset[type]
+    ) -> Any:
+        copied: dict[Any, Any] | None = None
+        if mapping.keys() <= self._harmless_keys:
+            # No key needs redacting, only what's nested might
+            for key, value in mapping.items():
+                if value.__class__ in skipped:
+                    continue
+                redacted = self._redact(value, depth, skipped)
+                if redacted is _UNCHANGED:
+                    continue
+                if copied is None:
+                    copied = dict(mapping)
+                copied[key] = redacted
+            return _UNCHANGED if copied is None else copied
+
+        # Lookups are inlined, as this runs for every key of every event
+        key_cache = self._key_cache
+        for key, value in mapping.items():
+            sensitive = key_cache.get(key)
+            if sensitive is None:
+                sensitive = self._classify_key(key)
+            if sensitive:
+                redacted = self.replacement
+            elif value.__class__ in skipped:
+                continue
+            else:
+                redacted = self._redact(value, depth, skipped)
+                if redacted is _UNCHANGED:
+                    continue
+            if copied is None:
+                copied = dict(mapping)
+            copied[key] = redacted
+        return _UNCHANGED if copied is None else copied
+
+    def __call__(
+        self, logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        keys = event_dict.keys()
+        if keys <= self._harmless_keys and keys.isdisjoint(self.value_fields):
+            # No key needs redacting, only what's nested might
+            skipped = self._skipped
+            for key, value in event_dict.items():
+                if value.__class__ in skipped:
+                    continue
+                redacted = self._redact(value, 0, skipped)
+                if redacted is not _UNCHANGED:
+                    event_dict[key] = redacted
+            return event_dict
+
+        # The event dict is this event's own, so its top level is changed
+        # in place; only nested containers are copied
+        redacted = self._redact_dict(event_dict, 0, self._skipped)
+        if redacted is not _UNCHANGED:
+            event_dict.update(redacted)
+        if not self.value_fields:
+            return event_dict
+        for key in keys & self.value_fields:
+            redacted = self._redact(event_dict[key], 0, _SCALARS)
+            if redacted is not _UNCHANGED:
+                event_dict[key] = redacted
+        return event_dict
+
+
+class RedactionSettings(BaseModel):
+    enabled: bool = False
+    keys: list[str] = list(DEFAULT_SENSITIVE_KEYS)
+    key_patterns: list[str] = []
+    # Regexes, or names from speedbeaver.redaction.VALUE_PATTERNS
+    value_patterns: list[str] = []
+    # Top-level fields value patterns are applied to, None for all of them
+    value_fields: list[str] | None = None
+    replacement: str = "[REDACTED]"
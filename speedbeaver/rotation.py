@@ -0,0 +1,155 @@
+"""
+Built-in rotation for `BufferedFileHandler`.
+
+A file is rolled over once it would grow past `max_bytes`, or once the
+clock crosses a multiple of `interval` seconds since the epoch, so an
+`interval` of 3600 rolls over on the hour (UTC) however long the file has
+been open. Rolled files are renamed with a
+timestamp (`app.log.20250102-030405`) so they never need renaming again,
+then compressed and pruned to the newest `backup_count` on a background
+thread, so a rollover costs the emitting thread no more than a rename.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from typing import Literal
+
+Compression = Literal["gzip"] | Literal["bz2"] | Literal["lzma"]
+
+COMPRESSION_SUFFIXES: dict[Compression, str] = {
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "lzma": ".xz",
+}
+
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+
+
+class RotationPolicy:
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        interval: float | None = None,
+        backup_count: int = 5,
+        compression: Compression | None = "gzip",
+    ):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compression: Compression | None = compression
+
+    def should_rollover(
+        self, file_size: int, incoming: int, opened_at: float
+    ) -> bool:
+        if file_size == 0:
+            return False
+        if self.max_bytes is not None and file_size + incoming > self.max_bytes:
+            return True
+        return (
+            self.interval is not None
+            and time.time() // self.interval > opened_at // self.interval
+        )
+
+    def rolled_name(self, base_filename: str) -> str:
+        rolled = f"{base_filename}.{time.strftime('%Y%m%d-%H%M%S')}"
+        candidate, attempt = rolled, 0
+        while any(
+            os.path.exists(candidate + suffix)
+            for suffix in ("", *COMPRESSION_SUFFIXES.values())
+        ):
+            attempt += 1
+            candidate = f"{rolled}-{attempt}"
+        return candidate
+
+    def rolled_files(self, base_filename: str) -> list[str]:
+        """
+        Returns the rolled files of `base_filename`, oldest first.
+        """
+        directory, name = os.path.split(base_filename)
+        pattern = re.compile(
+            re.escape(name) + r"\.\d{8}-\d{6}(-\d+)?(\.gz|\.bz2|\.xz)?\Z"
+        )
+        matches = [
+            entry.name
+            for entry in os.scandir(directory or ".")
+            if pattern.match(entry.name)
+        ]
+        return [
+            os.path.join(directory, rolled)
+            for rolled in sorted(matches, key=_rolled_sort_key)
+        ]
+
+
+def _rolled_sort_key(name: str) -> tuple[str, int]:
+    # "app.log.20250102-030405-2.gz" -> ("20250102-030405", 2)
+    for suffix in COMPRESSION_SUFFIXES.values():
+        name = name.removesuffix(suffix)
+    stamp = name.rsplit(".", 1)[-1]
+    date, clock, *attempt = stamp.split("-")
+    return f"{date}-{clock}", int(attempt[0]) if attempt else 0
+
+
+class RolledFileWorker:
+    """
+    Compresses rolled files and prunes old ones on a daemon thread that is
+    started on the first rollover. Compressed data is written to a `.tmp`
+    file first, so an interrupted run never leaves a truncated archive
+    behind.
+    """
+
+    def __init__(self, base_filename: str, policy: RotationPolicy):
+        self.base_filename = base_filename
+        self.policy = policy
+        self.jobs: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, rolled_path: str) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="speedbeaver-file-rotation", daemon=True
+            )
+            self._thread.start()
+        self.jobs.put(rolled_path)
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """
+        Lets queued jobs finish, waiting at most `timeout` seconds.
+        """
+        if self._thread is None:
+            return
+        self.jobs.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while (rolled_path := self.jobs.get()) is not None:
+            try:
+                if self.policy.compression is not None:
+                    self._compress(rolled_path, self.policy.compression)
+                self._prune()
+            except OSError:
+                # A failed compression leaves the plain file in place
+                pass
+
+    @staticmethod
+    def _compress(path: str, compression: Compression) -> None:
+        target = path + COMPRESSION_SUFFIXES[compression]
+        with (
+            open(path, "rb") as source,
+            _OPENERS[compression](target + ".tmp", "wb") as destination,
+        ):
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+        os.replace(target + ".tmp", target)
+        os.remove(path)
+
+    def _prune(self) -> None:
+        rolled = self.policy.rolled_files(self.base_filename)
+        for path in rolled[: max(len(rolled) - self.policy.backup_count, 0)]:
+            os.remove(path)
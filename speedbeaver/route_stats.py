@@ -0,0 +1,125 @@
+"""
+Per-route latency histograms for `StructlogMiddleware`.
+
+Request durations are counted in log-spaced buckets keyed by route template
+(e.g. `/items/{item_id}`, never the raw URL), method and status class, so
+memory stays fixed however many requests come in. Every interval the
+counts are turned into one summary event and started afresh.
+"""
+
+import threading
+import time
+from typing import Any
+
+# Each power of two is split into this many buckets, so a bucket is at most
+# 25% wider than its lower bound
+SUB_BUCKETS = 4
+# Covers up to 2**40us (about 12 days); anything slower shares the last
+# bucket
+BUCKET_COUNT = SUB_BUCKETS * 40
+
+
+def _bucket(value_us: int) -> int:
+    if value_us < SUB_BUCKETS:
+        return value_us
+    exponent = value_us.bit_length() - 3
+    index = (exponent + 1) * SUB_BUCKETS + ((value_us >> exponent) & 3)
+    return min(index, BUCKET_COUNT - 1)
+
+
+def _bucket_upper_bound(index: int) -> int:
+    if index < SUB_BUCKETS:
+        return index + 1
+    exponent = index // SUB_BUCKETS - 1
+    return (SUB_BUCKETS + index % SUB_BUCKETS + 1) << exponent
+
+
+class LatencyHistogram:
+    """
+    Counts durations in microseconds in fixed log-spaced buckets.
+    Percentiles are estimated as the upper bound of the bucket they fall in,
+    capped at the largest duration seen.
+    """
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.max_us = 0
+
+    def observe(self, duration_us: int) -> None:
+        self.counts[_bucket(duration_us)] += 1
+        self.count += 1
+        if duration_us > self.max_us:
+            self.max_us = duration_us
+
+    def percentile(self, fraction: float) -> int:
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(_bucket_upper_bound(index), self.max_us)
+        return self.max_us
+
+
+class RouteLatencyStats:
+    """
+    Collects request latencies and, once `interval` seconds have passed,
+    hands back a summary of them from `record()`. Summaries are only
+    produced as requests come in, so an idle app doesn't emit any.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str, str], LatencyHistogram] = {}
+        self._started = time.monotonic()
+
+    def record(
+        self, method: str, route: str, status_code: int, duration_ns: int
+    ) -> dict[str, Any] | None:
+        key = (method, route, f"{status_code // 100}xx")
+        now = time.monotonic()
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(duration_ns // 1000)
+            if now - self._started < self.interval:
+                return None
+            histograms, self._histograms = self._histograms, {}
+            started, self._started = self._started, now
+        return self.summarize(histograms, now - started)
+
+    def current_summary(self) -> dict[str, Any]:
+        """
+        Summarizes the interval so far, without starting a new one.
+        """
+        with self._lock:
+            return self.summarize(
+                self._histograms, time.monotonic() - self._started
+            )
+
+    @staticmethod
+    def summarize(
+        histograms: dict[tuple[str, str, str], LatencyHistogram],
+        elapsed: float,
+    ) -> dict[str, Any]:
+        return {
+            "interval_s": round(elapsed, 3),
+            "routes": [
+                {
+                    "method": method,
+                    "route": route,
+                    "status_class": status_class,
+                    "count": histogram.count,
+                    "p50_ms": histogram.percentile(0.5) / 1000,
+                    "p90_ms": histogram.percentile(0.9) / 1000,
+                    "p99_ms": histogram.percentile(0.99) / 1000,
+                    "max_ms": histogram.max_us / 1000,
+                }
+                for (method, route, status_class), histogram in sorted(
+                    histograms.items()
+                )
+            ],
+        }
@@ -0,0 +1,281 @@
+"""
+Changing log levels and sinks while the app is running.
+
+`LogSettings.configure` registers what it set up here, and
+`update_log_config` then changes sink levels, turns sinks on and off and
+sets individual loggers' levels in place, without restarting or
+reconfiguring structlog:
+
+    update_log_config(
+        LogConfigUpdate(sinks={"stream": SinkUpdate(log_level="DEBUG")})
+    )
+
+Loggers structlog has already cached follow along, since they share the
+adjustable wrapper class whose level is swapped. Sinks are swapped under
+the fan-out handler's lock, so every record goes to either the old sinks
+or the new ones, and a sink that's turned off is flushed and closed only
+once no record can reach it any more.
+
+`quick_configure` can also serve this over HTTP, and
+`RuntimeControlSettings.signal` toggles verbose logging on a signal.
+"""
+
+import logging
+import signal
+import threading
+from typing import TYPE_CHECKING, Any, Literal
+
+import structlog
+from pydantic import SecretStr
+from pydantic.main import BaseModel
+
+from speedbeaver.common import LogLevel
+from speedbeaver.loggers import set_min_level
+from speedbeaver.metrics import pipeline_metrics
+
+if TYPE_CHECKING:
+    from speedbeaver.config import LogSettings
+    from speedbeaver.handlers import FanOutHandler
+
+SinkName = Literal["stream"] | Literal["file"] | Literal["test"]
+SINK_NAMES: tuple[SinkName, ...] = ("stream", "file", "test")
+
+
+class SinkUpdate(BaseModel):
+    enabled: bool | None = None
+    log_level: LogLevel | None = None
+
+
+class LogConfigUpdate(BaseModel):
+    sinks: dict[SinkName, SinkUpdate] = {}
+    # Levels of individual `logging` loggers, None goes back to inheriting
+    # the parent's. A logger can't go below the sinks' levels.
+    loggers: dict[str, LogLevel | None] = {}
+
+
+class LogRuntime:
+    """
+    The pipeline `LogSettings.configure` set up, and the changes made to it
+    since.
+    """
+
+    def __init__(
+        self,
+        settings: "LogSettings",
+        fan_out: "FanOutHandler | None",
+        wrapper_class: type[structlog.stdlib.BoundLogger],
+        queue_handler: logging.Handler | None = None,
+    ):
+        self.settings = settings
+        self.fan_out = fan_out
+        self.wrapper_class = wrapper_class
+        self.queue_handler = queue_handler
+        self.logger_levels: dict[str, LogLevel] = {}
+        self._lock = threading.Lock()
+        self._before_verbose: LogConfigUpdate | None = None
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict[str, Any]:
+        return {
+            "sinks": {
+                name: {
+                    "enabled": getattr(self.settings, name).enabled,
+                    "log_level": getattr(self.settings, name).log_level,
+                }
+                for name in SINK_NAMES
+            },
+            "loggers": dict(self.logger_levels),
+            "min_level": logging.getLevelName(self.settings.min_log_level()),
+            "verbose": self._before_verbose is not None,
+        }
+
+    def apply(self, update: LogConfigUpdate) -> dict[str, Any]:
+        with self._lock:
+            return self._apply(update)
+
+    def _apply(self, update: LogConfigUpdate) -> dict[str, Any]:
+        settings = self.settings.model_copy(deep=True)
+        for name, sink_update in update.sinks.items():
+            sink_settings = getattr(settings, name)
+            for key, value in sink_update.model_dump(exclude_none=True).items():
+                setattr(sink_settings, key, value)
+
+        if self.fan_out is not None:
+            self._swap_sinks(settings, self.fan_out)
+        elif any(getattr(settings, name).enabled for name in update.sinks):
+            raise RuntimeError(
+                "No sinks were configured, so none can be enabled at "
+                "runtime. Call LogSettings.configure() instead."
+            )
+
+        # The sinks already take the new levels, so nothing is lost while
+        # the gates in front of them move
+        min_level = settings.min_log_level()
+        set_min_level(
+            self.wrapper_class, min_level, settings.escalation_level()
+        )
+        logging.getLogger().setLevel(min_level)
+        for logger_name, level in update.loggers.items():
+            logging.getLogger(logger_name).setLevel(level or logging.NOTSET)
+            if level is None:
+                self.logger_levels.pop(logger_name, None)
+            else:
+                self.logger_levels[logger_name] = level
+
+        self.settings = settings
+        return self._snapshot()
+
+    def _swap_sinks(
+        self, settings: "LogSettings", fan_out: "FanOutHandler"
+    ) -> None:
+        current = {
+            sink.get_name(): (output, sink)
+            for output, sink in fan_out.sink_outputs
+        }
+        enabled = [
+            name for name in SINK_NAMES if getattr(settings, name).enabled
+        ]
+        for name in enabled:
+            if name not in current and (
+                getattr(getattr(settings, name), "file_name", "") is None
+            ):
+                raise RuntimeError(
+                    f"The {name} sink has no file_name, so it can't be "
+                    "enabled at runtime."
+                )
+
+        sinks = []
+        added = []
+        for name in enabled:
+            sink_settings = getattr(settings, name)
+            existing = current.pop(name, None)
+            if existing is None:
+                try:
+                    sink = sink_settings.sink()
+                except OSError as e:
+                    # Nothing was swapped yet, the running sinks stay
+                    for new_sink in added:
+                        new_sink.close()
+                    raise RuntimeError(
+                        f"The {name} sink could not be opened: {e}"
+                    ) from e
+                added.append(sink)
+                existing = (sink_settings.output(), sink)
+            existing[1].setLevel(sink_settings.log_level)
+            sinks.append(existing)
+
+        fan_out.set_sinks(sinks)
+        pipeline_metrics.set_handlers(
+            [sink for _, sink in sinks]
+            + ([self.queue_handler] if self.queue_handler else [])
+        )
+        # No record can reach these any more
+        for _, removed in current.values():
+            removed.close()
+
+    def toggle_verbose(self, level: LogLevel = "DEBUG") -> dict[str, Any]:
+        """
+        Moves every enabled sink to `level`, or back to where they were if
+        they already are.
+        """
+        with self._lock:
+            if self._before_verbose is not None:
+                restore, self._before_verbose = self._before_verbose, None
+                return self._apply(restore)
+
+            enabled: list[SinkName] = [
+                name
+                for name in SINK_NAMES
+                if getattr(self.settings, name).enabled
+            ]
+            restore = LogConfigUpdate(
+                sinks={
+                    name: SinkUpdate(
+                        log_level=getattr(self.settings, name).log_level
+                    )
+                    for name in enabled
+                }
+            )
+            snapshot = self._apply(
+                LogConfigUpdate(
+                    sinks={
+                        name: SinkUpdate(log_level=level) for name in enabled
+                    }
+                )
+            )
+            self._before_verbose = restore
+            snapshot["verbose"] = True
+            return snapshot
+
+
+_active_runtime: LogRuntime | None = None
+
+
+def set_active_runtime(runtime: LogRuntime | None) -> None:
+    global _active_runtime
+    _active_runtime = runtime
+
+
+def _require_runtime() -> LogRuntime:
+    if _active_runtime is None:
+        raise RuntimeError("Logging hasn't been configured yet.")
+    return _active_runtime
+
+
+def get_log_config() -> dict[str, Any]:
+    """
+    Returns the sinks' current state and the loggers' levels set at
+    runtime.
+    """
+    return _require_runtime().snapshot()
+
+
+def update_log_config(update: LogConfigUpdate) -> dict[str, Any]:
+    """
+    Applies `update` to the running pipeline and returns the new state.
+    Changes last until the next one, or until `LogSettings.configure` sets
+    up different settings.
+    """
+    return _require_runtime().apply(update)
+
+
+def toggle_verbose(level: LogLevel = "DEBUG") -> dict[str, Any]:
+    return _require_runtime().toggle_verbose(level)
+
+
+class RuntimeControlSettings(BaseModel):
+    # Serves the current state (GET) and updates (POST) from quick_configure
+    enabled: bool = False
+    path: str = "/logging/config"
+    # Requests need an `Authorization: Bearer <token>` header, and are all
+    # refused while this isn't set
+    token: SecretStr | None = None
+    # Toggles verbose logging each time the process gets this signal
+    signal: Literal["SIGUSR1"] | Literal["SIGUSR2"] | None = None
+    verbose_level: LogLevel = "DEBUG"
+
+    def install_signal_handler(self) -> None:
+        if self.signal is None:
+            return
+        level = self.verbose_level
+
+        def handle_signal(signum, frame):
+            # The interrupted code may hold the runtime's or a handler's
+            # lock, so the toggle waits for them on a thread of its own
+            threading.Thread(
+                target=toggle_verbose,
+                args=(level,),
+                name="speedbeaver-toggle-verbose",
+                daemon=True,
+            ).start()
+
+        try:
+            signal.signal(getattr(signal, self.signal), handle_signal)
+        except (AttributeError, ValueError):
+            # Not on this platform, or not called from the main thread
+            logging.getLogger("speedbeaver.runtime").warning(
+                "Could not install the %s handler", self.signal
+            )
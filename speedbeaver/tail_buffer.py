@@ -0,0 +1,122 @@
+"""
+Request-scoped tail buffering of low-level events.
+
+While a request is in flight, events below `TailBufferSettings.level` are
+held back unrendered in a bounded buffer tied to the request's context.
+`StructlogMiddleware` writes them out if the request fails (an uncaught
+exception, a 5xx or a slow response) and throws them away otherwise, so a
+failed request comes with its debug trail without paying to render the
+trail of every request that went fine.
+"""
+
+import logging
+from collections import deque
+from contextvars import ContextVar, Token
+
+from pydantic.main import BaseModel
+
+from speedbeaver.common import LogLevel, resolve_exc_info
+from speedbeaver.escalation import is_escalated_for
+
+
+class RequestTailBuffer:
+    """
+    Holds up to `max_size` records, dropping (and counting) the oldest once
+    it's full.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.records: deque[logging.LogRecord] = deque(maxlen=max_size)
+        self.dropped = 0
+
+    def append(self, record: logging.LogRecord) -> None:
+        if len(self.records) == self.records.maxlen:
+            self.dropped += 1
+        self.records.append(record)
+
+
+_request_buffer: ContextVar[RequestTailBuffer | None] = ContextVar(
+    "speedbeaver_request_buffer", default=None
+)
+_replaying: ContextVar[bool] = ContextVar(
+    "speedbeaver_replaying_tail", default=False
+)
+
+
+def is_replaying() -> bool:
+    """
+    Whether the current records are a flushed tail buffer, which sinks
+    take regardless of their level.
+    """
+    return _replaying.get()
+
+
+class TailBufferFilter(logging.Filter):
+    """
+    Installed on the root handlers, it diverts records below `level` into
+    the current request's buffer, if there is one.
+    """
+
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # An escalated request wants its low-level events right away
+        if record.levelno >= self.level or is_escalated_for(record.levelno):
+            return True
+        buffer = _request_buffer.get()
+        if buffer is None:
+            return True
+        # Replayed later on, outside of the except block that logged it
+        resolve_exc_info(record)
+        buffer.append(record)
+        return False
+
+
+def start_request_buffer(
+    max_size: int,
+) -> Token[RequestTailBuffer | None]:
+    return _request_buffer.set(RequestTailBuffer(max_size))
+
+
+def end_request_buffer(
+    token: Token[RequestTailBuffer | None], flush: bool
+) -> None:
+    """
+    Ends the current request's buffering, writing the buffered records to
+    the root handlers if `flush` is set, and discarding them otherwise.
+    """
+    buffer = _request_buffer.get()
+    _request_buffer.reset(token)
+    if not flush or buffer is None or not buffer.records:
+        return
+
+    replaying = _replaying.set(True)
+    try:
+        if buffer.dropped:
+            logging.getLogger("speedbeaver.tail_buffer").warning(
+                "%s earlier events were dropped from the request's tail buffer",
+                buffer.dropped,
+            )
+        root_handlers = logging.getLogger().handlers
+        for record in buffer.records:
+            # The handlers' own levels would filter these out again
+            for handler in root_handlers:
+                handler.handle(record)
+    finally:
+        _replaying.reset(replaying)
+
+
+class TailBufferSettings(BaseModel):
+    enabled: bool = False
+    # Events below this level are buffered
+    level: LogLevel = "INFO"
+    max_size: int = 1000
+    # Requests at least this slow flush their buffer too
+    slow_threshold_ms: float | None = None
+
+    def filter(self) -> TailBufferFilter | None:
+        if not self.enabled:
+            return None
+        return TailBufferFilter(logging.getLevelName(self.level))
@@ -11,6 +11,12 @@ import pytest
 import structlog
 from structlog.stdlib import BoundLogger
 
+from speedbeaver import config, queue_handler, runtime
+from speedbeaver.loggers import (
+    AsyncBoundLogger,
+    make_adjustable_bound_logger,
+    set_min_level,
+)
 from speedbeaver.methods import get_logger
 
 os.environ.setdefault("TEST__ENABLED", "True")
@@ -38,6 +44,40 @@ async def cleanup_logging_handlers(log_dir: Path):
             _cleanup_handlers_for_logger(logger)
 
 
+@pytest.fixture(name="restore_logging")
+def fixture_restore_logging():
+    """
+    Lets a test configure logging however it likes, then closes what it set
+    up and puts back the handlers, levels and structlog configuration that
+    were there before.
+    """
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers, root_logger.level
+    # Detached, so that configure() doesn't close them
+    root_logger.handlers = []
+    structlog_config = structlog.get_config()
+    wrapper_class = make_adjustable_bound_logger(AsyncBoundLogger)
+    levels = (
+        wrapper_class.min_level,  # type: ignore[attr-defined]
+        wrapper_class.escalation_level,  # type: ignore[attr-defined]
+    )
+    applied = config._applied
+    active_runtime = runtime._active_runtime
+    active_listener = queue_handler._active_listener
+    try:
+        yield
+    finally:
+        # Drains and closes the test's queued handlers, if any
+        queue_handler.set_active_listener(active_listener)
+        for handler in root_logger.handlers:
+            handler.close()
+        root_logger.handlers, root_logger.level = handlers, level
+        structlog.configure(**structlog_config)
+        set_min_level(wrapper_class, *levels)
+        config._applied = applied
+        runtime.set_active_runtime(active_runtime)
+
+
 @pytest.fixture(name="decode_log")
 def fixture_decode_log():
     def _decode_log(record: str) -> LogLine:
@@ -0,0 +1,36 @@
+import pytest
+
+from speedbeaver.access_log import AccessLogSettings
+
+
+@pytest.fixture(name="access_policy")
+def fixture_access_policy():
+    return AccessLogSettings(
+        exclude_paths=["/health", "/static/*"],
+        route_sample_rates={"/api/*": 0.0},
+        slow_threshold_ms=100,
+    ).policy()
+
+
+@pytest.mark.parametrize(
+    ("path", "status_code", "duration", "expected"),
+    [
+        ("/health", 200, 0, None),
+        ("/static/css/main.css", 200, 0, None),
+        ("/health", 503, 0, 1.0),
+        ("/static/missing.css", 404, 0, 1.0),
+        ("/api/orders", 200, 0, None),
+        ("/api/orders", 200, 200_000_000, 1.0),
+        ("/", 200, 0, 1.0),
+    ],
+)
+def test_access_policy_sample(
+    access_policy, path, status_code, duration, expected
+):
+    assert access_policy.sample(path, status_code, duration) == expected
+
+
+def test_access_policy_records_sample_rate():
+    policy = AccessLogSettings(route_sample_rates={"/api/*": 0.5}).policy()
+    rates = {policy.sample("/api/orders", 200, 0) for _ in range(200)}
+    assert rates == {None, 0.5}
@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from speedbeaver.aggregation import (
+    AggregatingHandler,
+    AggregatorServer,
+    encode_frame,
+)
+from speedbeaver.handlers import BufferedFileHandler
+
+
+def _emit(handler: logging.Handler, msg: str):
+    handler.handle(
+        logging.LogRecord("test", logging.INFO, "", 0, msg, None, None)
+    )
+
+
+def test_aggregating_handler_ships_to_writer(tmp_path: Path):
+    socket_path = str(tmp_path / "app.sock")
+    log_path = tmp_path / "app.log"
+    writer = BufferedFileHandler(log_path, buffer_size=0)
+    server = AggregatorServer(socket_path, writer)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    handler = AggregatingHandler(socket_path, str(tmp_path / "fallback.log"))
+    for i in range(50):
+        _emit(handler, f"line {i}")
+    handler.close()
+
+    expected = [f"line {i}" for i in range(50)]
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if log_path.read_text().splitlines() == expected:
+            break
+        time.sleep(0.01)
+    server.shutdown()
+    server.server_close()
+    writer.close()
+
+    assert log_path.read_text().splitlines() == expected
+    assert not (tmp_path / "fallback.log").exists()
+
+
+def test_aggregating_handler_falls_back(tmp_path: Path):
+    fallback_path = tmp_path / "app.log"
+    handler = AggregatingHandler(
+        str(tmp_path / "missing.sock"), str(fallback_path)
+    )
+    _emit(handler, "no writer")
+    handler.close()
+
+    # Each worker has its own fallback file, the aggregator's is left alone
+    assert not fallback_path.exists()
+    worker_fallback = tmp_path / f"app.log.fallback-{os.getpid()}"
+    assert worker_fallback.read_text() == "no writer\n"
+
+
+class _FailingSocket:
+    """
+    Takes `accepted` bytes, then fails like a connection that went away.
+    """
+
+    def __init__(self, accepted: int):
+        self.accepted = accepted
+
+    def send(self, data: memoryview) -> int:
+        if self.accepted == 0:
+            raise BrokenPipeError
+        sent = min(self.accepted, len(data))
+        self.accepted -= sent
+        return sent
+
+    def close(self):
+        pass
+
+
+def test_aggregating_handler_falls_back_after_partial_send(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    handler = AggregatingHandler(
+        str(tmp_path / "missing.sock"), str(tmp_path / "app.log")
+    )
+    entries = [(f"line {i}\n".encode(), logging.INFO) for i in range(3)]
+    # The first frame and part of the second got through
+    monkeypatch.setattr(
+        handler, "_socket", _FailingSocket(len(encode_frame(*entries[0])) + 3)
+    )
+    handler._send(entries)
+    handler.close()
+
+    assert handler.connection_failures == 1
+    worker_fallback = tmp_path / f"app.log.fallback-{os.getpid()}"
+    assert worker_fallback.read_text() == "line 1\nline 2\n"
@@ -0,0 +1,125 @@
+import logging
+from typing import Any
+
+import pytest
+import structlog
+from structlog.processors import CallsiteParameter, CallsiteParameterAdder
+from structlog.types import EventDict
+
+from speedbeaver.loggers import make_filtering_bound_logger
+from speedbeaver.processor_collection_builder import ProcessorCollectionBuilder
+
+
+def _add_marker(_, __, event_dict):
+    event_dict["marker"] = event_dict.get("logger")
+    return event_dict
+
+
+def _builder() -> ProcessorCollectionBuilder:
+    return (
+        ProcessorCollectionBuilder()
+        .add_log_level()
+        .add_processor(_add_marker)
+        .add_logger_name()
+        .add_positional_arguments()
+        .add_stack_info_renderer()
+    )
+
+
+@pytest.mark.parametrize(
+    ("method_name", "event_dict"),
+    [
+        ("info", {"event": "hello %s", "positional_args": ("world",)}),
+        ("warn", {"event": "%(a)s", "positional_args": ({"a": 1},)}),
+        ("exception", {"event": "plain", "color_message": "plain"}),
+        ("debug", {"event": "stack", "stack_info": False}),
+    ],
+)
+def test_compiled_pipeline_matches_list(method_name, event_dict):
+    logger = logging.getLogger("speedbeaver.test.compiled")
+    structlog.contextvars.bind_contextvars(compiled="yes")
+    try:
+        expected = dict(event_dict)
+        for processor in _builder().get_processors():
+            result = processor(logger, method_name, expected)
+            assert isinstance(result, dict)
+            expected = result
+        actual = _builder().compile()(logger, method_name, dict(event_dict))
+    finally:
+        structlog.contextvars.unbind_contextvars("compiled")
+
+    assert isinstance(actual, dict)
+    assert actual == expected
+    assert actual["compiled"] == "yes"
+
+
+def test_compiled_pipeline_foreign_record():
+    record = logging.LogRecord(
+        "foreign", logging.INFO, "", 0, "msg", None, None
+    )
+    record.custom = "extra"
+    compiled = _builder().compile()
+    event_dict = compiled(None, "info", {"event": "msg", "_record": record})
+
+    assert isinstance(event_dict, dict)
+    assert event_dict["logger"] == "foreign"
+    assert event_dict["custom"] == "extra"
+
+
+def _capturing_logger(
+    builder: ProcessorCollectionBuilder, seen: list[EventDict]
+) -> Any:
+    def record_event(_, __, event_dict):
+        seen.append(event_dict)
+        raise structlog.DropEvent
+
+    return structlog.wrap_logger(
+        logging.getLogger("speedbeaver.test.callsite"),
+        processors=[builder.compile(), record_event],
+        wrapper_class=make_filtering_bound_logger(logging.INFO),
+    ).bind()
+
+
+@pytest.mark.parametrize(
+    "builder",
+    [
+        ProcessorCollectionBuilder().add_callsite_parameters(preset="light"),
+        # Built by the app, without knowing about speedbeaver's frames
+        ProcessorCollectionBuilder().add_processor(
+            CallsiteParameterAdder([CallsiteParameter.FUNC_NAME])
+        ),
+    ],
+)
+def test_compiled_pipeline_callsite_is_the_caller(
+    builder: ProcessorCollectionBuilder,
+):
+    seen: list[EventDict] = []
+    logger = _capturing_logger(builder, seen)
+
+    logger.info("method")
+    logger.log(logging.INFO, "log")
+
+    assert [event["func_name"] for event in seen] == [
+        "test_compiled_pipeline_callsite_is_the_caller"
+    ] * 2
+
+
+def test_compiled_pipeline_stack_ends_at_the_caller():
+    seen: list[EventDict] = []
+    logger = _capturing_logger(
+        ProcessorCollectionBuilder().add_stack_info_renderer(), seen
+    )
+
+    logger.info("method", stack_info=True)
+    logger.log(logging.INFO, "log", stack_info=True)
+
+    for event in seen:
+        last_frame = [
+            line
+            for line in event["stack"].splitlines()
+            if line.lstrip().startswith("File ")
+        ][-1]
+        assert last_frame.endswith(
+            "in test_compiled_pipeline_stack_ends_at_the_caller"
+        )
+    assert len(seen) == 2
@@ -0,0 +1,103 @@
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import orjson
+import pytest
+import structlog
+from structlog.processors import CallsiteParameter, CallsiteParameterAdder
+
+from speedbeaver.config import LogSettings
+from speedbeaver.handlers import (
+    BufferedFileHandler,
+    FanOutHandler,
+    LogFileSettings,
+    LogStreamSettings,
+    LogTestSettings,
+)
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_configure_skips_unchanged_settings(tmp_path: Path):
+    root_logger = logging.getLogger()
+    test = LogTestSettings(file_name=str(tmp_path / "config.log"))
+    LogSettings(test=test).configure()
+    handlers = root_logger.handlers
+    LogSettings(test=test).configure()
+    assert root_logger.handlers is handlers
+
+    LogSettings(test=test, log_level="DEBUG").configure()
+    assert root_logger.handlers is not handlers
+
+    handlers = root_logger.handlers
+    LogSettings(test=test, log_level="DEBUG").configure(force=True)
+    assert root_logger.handlers is not handlers
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_configure_closes_replaced_handlers(tmp_path: Path):
+    root_logger = logging.getLogger()
+    settings = LogSettings(
+        stream=LogStreamSettings(enabled=False),
+        file=LogFileSettings(
+            enabled=True, file_name=str(tmp_path / "closed.log")
+        ),
+        test=LogTestSettings(file_name=str(tmp_path / "closed.test.log")),
+    )
+    settings.configure()
+    (fan_out,) = root_logger.handlers
+    assert isinstance(fan_out, FanOutHandler)
+    sinks = {sink.get_name(): sink for sink in fan_out.sinks}
+    file_handler = sinks["file"]
+    assert isinstance(file_handler, BufferedFileHandler)
+    assert file_handler._flush_thread is not None
+
+    settings.configure(force=True)
+    assert root_logger.handlers != [fan_out]
+    assert file_handler.stream is None
+    file_handler._flush_thread.join(timeout=5)
+    assert not file_handler._flush_thread.is_alive()
+
+
+@pytest.mark.usefixtures("restore_logging")
+async def test_processor_override_callsite_skips_internal_frames(
+    tmp_path: Path,
+):
+    log_path = tmp_path / "override.test.log"
+    LogSettings(
+        stream=LogStreamSettings(enabled=False),
+        test=LogTestSettings(file_name=str(log_path)),
+        processor_override=[
+            structlog.stdlib.add_log_level,
+            CallsiteParameterAdder([CallsiteParameter.FUNC_NAME]),
+        ],
+    ).configure(force=True)
+    logger = structlog.stdlib.get_logger("speedbeaver.test.override").bind()
+
+    logger.info("method")
+    logger.log(logging.INFO, "log")
+    await logger.ainfo("async")
+    logging.getLogger().handlers[0].flush()
+
+    assert [
+        orjson.loads(line)["func_name"]
+        for line in log_path.read_bytes().splitlines()
+    ] == ["test_processor_override_callsite_skips_internal_frames"] * 3
+
+
+def test_get_logger_does_not_import_web_stack():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from speedbeaver import get_logger, LogSettings\n"
+            "print(sorted({'fastapi', 'starlette', 'asgi_correlation_id'}"
+            " & set(sys.modules)))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import orjson
+import pytest
+import structlog
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from speedbeaver.config import LogSettings
+from speedbeaver.escalation import (
+    sign_escalation_token,
+    verify_escalation_token,
+)
+from speedbeaver.handlers import LogStreamSettings, LogTestSettings
+from speedbeaver.middleware import StructlogMiddleware
+
+
+def test_escalation_tokens():
+    token = sign_escalation_token("secret")
+    assert verify_escalation_token("secret", token)
+    assert not verify_escalation_token("other", token)
+    tampered = token[:-1] + ("1" if token.endswith("0") else "0")
+    assert not verify_escalation_token("secret", tampered)
+    assert not verify_escalation_token(
+        "secret", sign_escalation_token("secret", ttl_s=-10)
+    )
+    assert not verify_escalation_token("secret", "garbage")
+
+
+@pytest.mark.usefixtures("restore_logging")
+async def test_middleware_escalates_signed_requests(tmp_path: Path):
+    log_path = tmp_path / "escalation.test.log"
+    settings = {
+        "stream": LogStreamSettings(enabled=False),
+        "test": LogTestSettings(file_name=str(log_path), log_level="INFO"),
+        "debug_escalation": {"enabled": True, "secret": "secret"},
+    }
+    LogSettings(**settings).configure(force=True)
+
+    app = FastAPI()
+    app.add_middleware(StructlogMiddleware, configure_logs=False, **settings)
+    logger = structlog.stdlib.get_logger("speedbeaver.test.escalation")
+
+    @app.get("/")
+    async def index():
+        logger.debug("sync debug")
+        await logger.adebug("async debug")
+        await logger.ainfo("info")
+        return {}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        plain = await client.get("/")
+        escalated = await client.get(
+            "/", headers={"X-Debug-Log": sign_escalation_token("secret")}
+        )
+        forged = await client.get("/", headers={"X-Debug-Log": "1.abc"})
+
+    events: dict[str, list[str]] = {}
+    for line in log_path.read_bytes().splitlines():
+        event = orjson.loads(line)
+        if event["logger"] == "speedbeaver.test.escalation":
+            events.setdefault(event["request_id"], []).append(event["event"])
+    request_id = "X-Request-ID"
+    assert events[plain.headers[request_id]] == ["info"]
+    assert events[forged.headers[request_id]] == ["info"]
+    assert events[escalated.headers[request_id]] == [
+        "sync debug",
+        "async debug",
+        "info",
+    ]
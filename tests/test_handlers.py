@@ -0,0 +1,438 @@
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+import orjson
+import pytest
+
+from speedbeaver.handlers import (
+    BufferedFileHandler,
+    FanOutHandler,
+    LogOutput,
+    TUIStreamHandler,
+    tui_supports_socket,
+)
+from speedbeaver.rotation import RotationPolicy
+
+
+def test_buffered_file_handler_flushes(tmp_path: Path):
+    log_path = tmp_path / "buffered.log"
+    handler = BufferedFileHandler(log_path, flush_interval=0)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(level: int, msg: str):
+        handler.handle(logging.LogRecord("test", level, "", 0, msg, None, None))
+
+    emit(logging.INFO, "buffered")
+    assert log_path.read_text() == ""
+
+    emit(logging.ERROR, "flushed")
+    assert log_path.read_text() == "buffered\nflushed\n"
+
+    emit(logging.INFO, "closed")
+    handler.close()
+    assert log_path.read_text() == "buffered\nflushed\nclosed\n"
+
+
+def test_fan_out_handler_renders_once_per_output(tmp_path: Path):
+    calls = []
+
+    def count_calls(_, __, event_dict):
+        calls.append(event_dict["event"])
+        return event_dict
+
+    json_output = LogOutput(json_logs=True)
+    console_output = LogOutput()
+    sinks = [
+        (json_output, BufferedFileHandler(tmp_path / "a.json", buffer_size=0)),
+        (json_output, BufferedFileHandler(tmp_path / "b.json", buffer_size=0)),
+        (
+            console_output,
+            BufferedFileHandler(tmp_path / "c.log", buffer_size=0),
+        ),
+    ]
+    handler = FanOutHandler([count_calls], sinks)
+    reference = {
+        name: output.formatter([count_calls])
+        for name, (output, _) in zip(
+            ["a.json", "b.json", "c.log"], sinks, strict=True
+        )
+    }
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "test", logging.ERROR, "", 0, "failed %s", ("x",), sys.exc_info()
+        )
+    handler.handle(record)
+    handler.close()
+    # The shared processors ran once for all three sinks
+    assert calls == ["failed x"]
+
+    for name, formatter in reference.items():
+        assert (tmp_path / name).read_text() == formatter.format(record) + "\n"
+
+
+def test_bytes_native_json_output(tmp_path: Path):
+    class Opaque:
+        def __repr__(self):
+            return "<opaque>"
+
+    sink = BufferedFileHandler(tmp_path / "bytes.json", buffer_size=0)
+    handler = FanOutHandler(
+        [], [(LogOutput(json_logs=True, bytes_native=True), sink)]
+    )
+    record = logging.LogRecord("test", logging.INFO, "", 0, {}, None, None)
+    record.msg = {
+        "event": "hello",
+        "when": datetime.datetime(2025, 1, 2, tzinfo=datetime.timezone.utc),
+        "id": uuid.UUID(int=1),
+        "opaque": Opaque(),
+        1: "non-string key",
+    }
+    record._logger = logging.getLogger("test")
+    record._name = "info"
+    handler.handle(record)
+    handler.close()
+
+    assert json.loads((tmp_path / "bytes.json").read_bytes()) == {
+        "event": "hello",
+        "when": "2025-01-02T00:00:00+00:00",
+        "id": "00000000-0000-0000-0000-000000000001",
+        "opaque": "<opaque>",
+        "1": "non-string key",
+    }
+
+
+def test_fan_out_rejects_sinks_without_emit_rendered():
+    with pytest.raises(TypeError, match="emit_rendered"):
+        FanOutHandler([], [(LogOutput(), logging.NullHandler())])
+
+
+def test_rotation_interval_aligns_to_boundaries(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    policy = RotationPolicy(interval=3600)
+    monkeypatch.setattr("speedbeaver.rotation.time.time", lambda: 7300.0)
+    # Opened 100s ago, but in the previous hour
+    assert policy.should_rollover(10, 0, opened_at=7100.0)
+    # Opened in this hour
+    assert not policy.should_rollover(10, 0, opened_at=7200.0)
+
+
+def test_buffered_file_handler_rotates_and_compresses(tmp_path: Path):
+    log_path = tmp_path / "rotating.log"
+    handler = BufferedFileHandler(
+        log_path,
+        buffer_size=0,
+        rotation=RotationPolicy(max_bytes=100, backup_count=2),
+    )
+    for i in range(12):
+        handler.write(f"{i:02d}".ljust(39) + "\n")
+    # Waits for the background compression to finish
+    handler.close()
+
+    rolled = RotationPolicy().rolled_files(str(log_path))
+    assert len(rolled) == 2
+    assert all(path.endswith(".gz") for path in rolled)
+    # Each file took two lines before the third would have crossed 100 bytes
+    with gzip.open(rolled[-1], "rt") as newest_rolled:
+        assert newest_rolled.read().split() == ["08", "09"]
+    assert log_path.read_text().split() == ["10", "11"]
+
+
+def _emit(handler: logging.Handler, msg: str):
+    handler.handle(
+        logging.LogRecord("test", logging.INFO, "", 0, msg, None, None)
+    )
+
+
+class _Viewer:
+    """
+    Stands in for a shared viewer, collecting what every connection sends.
+    """
+
+    def __init__(self, socket_path: str):
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen()
+        self.received = bytearray()
+        self.connections: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            thread = threading.Thread(
+                target=self._read, args=(connection,), daemon=True
+            )
+            self.connections.append(thread)
+            thread.start()
+
+    def _read(self, connection: socket.socket):
+        chunks = []
+        with connection:
+            while chunk := connection.recv(65536):
+                chunks.append(chunk)
+        with self._lock:
+            self.received += b"".join(chunks)
+
+    def entries(self, connections: int = 1) -> list[dict[str, Any]]:
+        """
+        Waits for `connections` connections to be closed.
+        """
+        deadline = time.monotonic() + 5
+        while (
+            len(self.connections) < connections and time.monotonic() < deadline
+        ):
+            time.sleep(0.01)
+        for thread in self.connections:
+            thread.join(timeout=5)
+        self.server.close()
+        return [orjson.loads(line) for line in self.received.splitlines()]
+
+
+def test_tui_handler_drains_on_close(tmp_path: Path):
+    socket_path = str(tmp_path / "tui.sock")
+    viewer = _Viewer(socket_path)
+    handler = TUIStreamHandler(stream=io.StringIO(), socket_path=socket_path)
+    for i in range(1000):
+        _emit(handler, f"line {i}")
+    handler.close()
+
+    entries = viewer.entries()
+    assert [entry["message"] for entry in entries] == [
+        f"line {i}" for i in range(1000)
+    ]
+    assert {entry["pid"] for entry in entries} == {os.getpid()}
+
+
+def test_tui_handler_drops_oldest_when_full(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    handler = TUIStreamHandler(
+        stream=io.StringIO(),
+        buffer_size=3,
+        socket_path=str(tmp_path / "tui.sock"),
+    )
+    release = threading.Event()
+    written: list[str] = []
+
+    def write(entries: list[dict[str, Any]]) -> bool:
+        release.wait()
+        written.extend(entry["message"] for entry in entries)
+        return True
+
+    monkeypatch.setattr(handler, "_write", write)
+    _emit(handler, "first")
+    # Wait for the writer to pick it up and get stuck writing it
+    deadline = time.monotonic() + 5
+    while handler.buffer and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for i in range(5):
+        _emit(handler, f"line {i}")
+    assert handler.dropped == 2
+
+    release.set()
+    handler.close()
+    assert written == [
+        "first",
+        "2 records dropped, the viewer couldn't keep up",
+        "line 2",
+        "line 3",
+        "line 4",
+    ]
+
+
+def test_tui_handler_falls_back_to_stream(monkeypatch: pytest.MonkeyPatch):
+    # A viewer that exits right away
+    monkeypatch.setattr(
+        "speedbeaver.handlers.find_tui_command",
+        lambda: ([sys.executable, "-c", ""], None),
+    )
+    stream = io.StringIO()
+    handler = TUIStreamHandler(stream=stream)
+    assert handler.tui_process is not None
+    handler.tui_process.wait()
+
+    _emit(handler, "first")
+    deadline = time.monotonic() + 5
+    while handler._sender_thread is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _emit(handler, "second")
+    handler.close()
+
+    assert handler.pipe_failures == 1
+    assert stream.getvalue() == "first\nsecond\n"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_tui_handler_restarts_after_fork(tmp_path: Path):
+    socket_path = str(tmp_path / "tui.sock")
+    viewer = _Viewer(socket_path)
+    handler = TUIStreamHandler(stream=io.StringIO(), socket_path=socket_path)
+    _emit(handler, "parent")
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _emit(handler, "child")
+            handler.close()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    handler.close()
+
+    entries = viewer.entries(connections=2)
+    assert sorted((entry["message"], entry["pid"]) for entry in entries) == [
+        ("child", pid),
+        ("parent", os.getpid()),
+    ]
+
+
+# Listens on the socket given with --socket like the real viewer, noting
+# its PID and everything it receives next to the socket
+FAKE_SOCKET_VIEWER = """
+import os, socket, sys, threading
+
+path = sys.argv[sys.argv.index("--socket") + 1]
+with open(path + ".pids", "a") as pids:
+    pids.write(f"{os.getpid()}\\n")
+if os.path.exists(path):
+    os.remove(path)
+server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+server.bind(path)
+server.listen()
+
+
+def read(connection):
+    with connection, open(path + ".received", "ab") as received:
+        while chunk := connection.recv(65536):
+            received.write(chunk)
+            received.flush()
+
+
+while True:
+    connection, _ = server.accept()
+    threading.Thread(target=read, args=(connection,), daemon=True).start()
+"""
+
+
+@pytest.fixture(name="fake_socket_viewer")
+def fixture_fake_socket_viewer(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    script = tmp_path / "viewer.py"
+    script.write_text(FAKE_SOCKET_VIEWER)
+    monkeypatch.setattr(
+        "speedbeaver.handlers.find_tui_command",
+        lambda: ([sys.executable, str(script)], None),
+    )
+    monkeypatch.setattr(
+        "speedbeaver.handlers.tui_supports_socket", lambda args, cwd: True
+    )
+    socket_path = tmp_path / "tui.sock"
+    pids_path = Path(f"{socket_path}.pids")
+    yield socket_path
+    # The viewers run in their own sessions, so they're not our children
+    if pids_path.exists():
+        for pid in pids_path.read_text().split():
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(int(pid), signal.SIGTERM)
+
+
+def _wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_tui_viewer_socket_support_is_detected(tmp_path: Path):
+    old_viewer = tmp_path / "old-viewer"
+    old_viewer.write_bytes(b"\x7fELF stdin only")
+    new_viewer = tmp_path / "new-viewer"
+    new_viewer.write_bytes(
+        b"\x7fELF listen for logs on this Unix socket instead of stdin"
+    )
+
+    assert not tui_supports_socket((str(old_viewer),), None)
+    assert tui_supports_socket((str(new_viewer),), None)
+    assert not tui_supports_socket((str(tmp_path / "missing"),), None)
+
+
+def test_tui_handler_skips_viewers_without_socket_support(
+    fake_socket_viewer: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(
+        "speedbeaver.handlers.tui_supports_socket", lambda args, cwd: False
+    )
+    stream = io.StringIO()
+    handler = TUIStreamHandler(
+        stream=stream, socket_path=str(fake_socket_viewer)
+    )
+    _emit(handler, "local")
+    handler.close()
+
+    assert stream.getvalue() == "local\n"
+    assert not Path(f"{fake_socket_viewer}.pids").exists()
+
+
+def test_tui_handler_starts_and_restarts_shared_viewer(
+    fake_socket_viewer: Path,
+):
+    stream = io.StringIO()
+    handler = TUIStreamHandler(
+        stream=stream,
+        socket_path=str(fake_socket_viewer),
+        reconnect_interval=0.1,
+    )
+    pids_path = Path(f"{fake_socket_viewer}.pids")
+    received_path = Path(f"{fake_socket_viewer}.received")
+
+    def received() -> list[str]:
+        if not received_path.exists():
+            return []
+        return [
+            orjson.loads(line)["message"]
+            for line in received_path.read_bytes().splitlines()
+        ]
+
+    def emit_until_received(msg: str) -> bool:
+        def arrived():
+            _emit(handler, msg)
+            return msg in received()
+
+        return _wait_for(arrived)
+
+    try:
+        # Nothing is listening yet, so the first attempt starts the viewer
+        # and the records stay on the stream until it's connected
+        assert emit_until_received("first viewer")
+        assert stream.getvalue().startswith("first viewer\n")
+        (first_pid,) = pids_path.read_text().split()
+
+        os.kill(int(first_pid), signal.SIGTERM)
+        # Once writes to the dead viewer fail, a new one is started
+        assert emit_until_received("second viewer")
+        assert len(pids_path.read_text().split()) == 2
+        assert handler.pipe_failures >= 1
+    finally:
+        handler.close()
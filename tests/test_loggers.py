@@ -0,0 +1,131 @@
+import asyncio
+import logging
+
+import pytest
+import structlog
+
+from speedbeaver.loggers import AsyncBoundLogger, make_filtering_bound_logger
+from speedbeaver.processors import INTERNAL_CALLSITE_MODULES
+from speedbeaver.queue_handler import LogQueueSettings, set_active_listener
+
+
+async def test_filtering_bound_logger_skips_processors():
+    seen = []
+
+    def record_method(_, method_name, event_dict):
+        seen.append(method_name)
+        raise structlog.DropEvent
+
+    logger = structlog.wrap_logger(
+        logging.getLogger("speedbeaver.test.filtering"),
+        processors=[record_method],
+        wrapper_class=make_filtering_bound_logger(logging.INFO),
+    ).bind()
+
+    logger.debug("skipped")
+    await logger.adebug("skipped")
+    logger.log(logging.DEBUG, "skipped")
+    logger.info("kept")
+    await logger.awarning("kept")
+    logger.log(logging.ERROR, "kept")
+
+    assert seen == ["info", "warning", "error"]
+    assert not logger.isEnabledFor(logging.DEBUG)
+    assert make_filtering_bound_logger(logging.INFO) is type(logger)
+
+
+def _recording_async_logger(
+    name: str, seen: list, additional_ignores: list[str] | None = None
+):
+    def record_event(_, __, event_dict):
+        seen.append(event_dict)
+        raise structlog.DropEvent
+
+    return structlog.wrap_logger(
+        logging.getLogger(name),
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.CallsiteParameterAdder(
+                [structlog.processors.CallsiteParameter.FUNC_NAME],
+                additional_ignores=additional_ignores,
+            ),
+            record_event,
+        ],
+        wrapper_class=make_filtering_bound_logger(
+            logging.INFO, base=AsyncBoundLogger
+        ),
+    ).bind()
+
+
+@pytest.mark.usefixtures("restore_logging")
+async def test_async_bound_logger_skips_executor_with_queue(monkeypatch):
+    handler = LogQueueSettings().handler([logging.NullHandler()])
+    assert handler is not None
+    set_active_listener(handler.listener)
+
+    def no_executor(*args, **kwargs):
+        raise AssertionError("the executor was used")
+
+    monkeypatch.setattr(
+        asyncio.get_running_loop(), "run_in_executor", no_executor
+    )
+    seen = []
+    logger = _recording_async_logger(
+        "speedbeaver.test.async", seen, INTERNAL_CALLSITE_MODULES
+    )
+
+    with structlog.contextvars.bound_contextvars(request_id="abc"):
+        await logger.ainfo("hello %s", "world")
+        await logger.alog(logging.INFO, "logged")
+        await logger.adebug("filtered")
+
+    assert [
+        (event["event"], event["request_id"], event["func_name"])
+        for event in seen
+    ] == [
+        (
+            "hello %s",
+            "abc",
+            "test_async_bound_logger_skips_executor_with_queue",
+        ),
+        ("logged", "abc", "test_async_bound_logger_skips_executor_with_queue"),
+    ]
+
+
+@pytest.mark.usefixtures("restore_logging")
+async def test_async_bound_logger_uses_executor_without_queue(monkeypatch):
+    set_active_listener(None)
+    loop = asyncio.get_running_loop()
+    run_in_executor = loop.run_in_executor
+    executor_calls = []
+
+    def counting_executor(*args, **kwargs):
+        executor_calls.append(args)
+        return run_in_executor(*args, **kwargs)
+
+    monkeypatch.setattr(loop, "run_in_executor", counting_executor)
+    seen = []
+    # The executor path keeps structlog's exact callsite on its own
+    logger = _recording_async_logger("speedbeaver.test.async", seen)
+
+    with structlog.contextvars.bound_contextvars(request_id="abc"):
+        await logger.ainfo("hello %s", "world")
+        await logger.alog(logging.INFO, "logged")
+        await logger.adebug("filtered")
+
+    assert len(executor_calls) == 2
+    assert [
+        (event["event"], event["request_id"], event["func_name"])
+        for event in seen
+    ] == [
+        (
+            "hello %s",
+            "abc",
+            "test_async_bound_logger_uses_executor_without_queue",
+        ),
+        (
+            "logged",
+            "abc",
+            "test_async_bound_logger_uses_executor_without_queue",
+        ),
+    ]
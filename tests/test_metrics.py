@@ -0,0 +1,49 @@
+import logging
+from pathlib import Path
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from speedbeaver.handlers import BufferedFileHandler, FanOutHandler, LogOutput
+from speedbeaver.metrics import LoggingMetrics
+from speedbeaver.middleware import metrics_endpoint
+
+
+def test_fan_out_handler_records_metrics(tmp_path: Path):
+    metrics = LoggingMetrics()
+    sink = BufferedFileHandler(tmp_path / "metrics.log", buffer_size=0)
+    sink.set_name("file")
+    sink.setLevel(logging.INFO)
+    handler = FanOutHandler([], [(LogOutput(), sink)], metrics=metrics)
+    metrics.set_handlers([sink])
+
+    for level in (logging.DEBUG, logging.INFO, logging.INFO):
+        handler.handle(
+            logging.LogRecord("app.db", level, "", 0, "qüery", None, None)
+        )
+    handler.close()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["events"] == {"app.db": {"DEBUG": 1, "INFO": 2}}
+    # The DEBUG record never reached the sink
+    assert snapshot["emit_latency"]["file"]["count"] == 2
+    assert snapshot["emit_latency"]["file"]["buckets"]["+Inf"] == 2
+    # Bytes, not characters
+    assert snapshot["rendered_bytes"]["file"] == 2 * len("qüery".encode())
+
+    text = metrics.render_prometheus()
+    assert 'speedbeaver_events_total{level="INFO",logger="app.db"} 2' in text
+    assert 'speedbeaver_emit_duration_seconds_count{sink="file"} 2' in text
+
+
+async def test_metrics_endpoint():
+    app = FastAPI()
+    app.add_route("/logging/metrics", metrics_endpoint)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        response = await client.get("/logging/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE speedbeaver_events_total counter" in response.text
@@ -0,0 +1,91 @@
+import uuid
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from speedbeaver.access_log import AccessLogSettings
+from speedbeaver.handlers import LogStreamSettings, LogTestSettings
+from speedbeaver.middleware import StructlogMiddleware
+
+
+@pytest.fixture(name="test_client")
+async def fixture_test_client(restore_logging, tmp_path: Path):
+    app = FastAPI()
+    app.add_middleware(
+        StructlogMiddleware,
+        stream=LogStreamSettings(enabled=False),
+        test=LogTestSettings(file_name=str(tmp_path / "middleware.test.log")),
+    )
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        yield client
+
+
+async def test_middleware_streams_response(test_client: AsyncClient):
+    async with test_client.stream("GET", "/stream") as response:
+        chunks = [chunk async for chunk in response.aiter_text()]
+
+    assert response.status_code == 200
+    assert "".join(chunks) == "chunk 0\nchunk 1\nchunk 2\n"
+    assert float(response.headers["X-Process-Time"]) >= 0
+    assert uuid.UUID(response.headers["X-Request-ID"]).version == 4
+
+
+async def test_middleware_reuses_request_id(test_client: AsyncClient):
+    request_id = uuid.uuid4().hex
+    response = await test_client.get(
+        "/stream", headers={"X-Request-ID": request_id}
+    )
+    assert response.headers["X-Request-ID"] == request_id
+
+    response = await test_client.get(
+        "/stream", headers={"X-Request-ID": "not-a-uuid"}
+    )
+    assert response.headers["X-Request-ID"] != "not-a-uuid"
+
+
+@pytest.mark.usefixtures("restore_logging")
+async def test_middleware_route_stats_by_template(tmp_path: Path):
+    items = FastAPI()
+
+    @items.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    middleware = StructlogMiddleware(
+        items,
+        stream=LogStreamSettings(enabled=False),
+        test=LogTestSettings(file_name=str(tmp_path / "middleware.test.log")),
+        access=AccessLogSettings(route_stats=True, route_stats_only=True),
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=middleware), base_url="http://testserver"
+    ) as client:
+        for item_id in range(3):
+            await client.get(f"/items/{item_id}")
+        await client.get("/missing")
+
+    assert middleware.route_stats is not None
+    summary = middleware.route_stats.current_summary()
+    assert [
+        (route["method"], route["route"], route["status_class"], route["count"])
+        for route in summary["routes"]
+    ] == [
+        ("GET", "/items/{item_id}", "2xx", 3),
+        ("GET", "<unmatched>", "4xx", 1),
+    ]
+    # Only the 404 still gets its own access line
+    assert middleware.access_policy.sample("/items/1", 200, 0) is None
@@ -0,0 +1,71 @@
+import datetime
+import logging
+
+import pytest
+from structlog.processors import TimeStamper
+
+from speedbeaver.processors import (
+    CachedTimeStamper,
+    GatedCallsiteParameterAdder,
+)
+
+
+@pytest.mark.parametrize(
+    ("logger_name", "method_name", "captured"),
+    [
+        ("app", "info", False),
+        ("app", "warning", True),
+        ("app", "exception", True),
+        ("app.db", "debug", True),
+        ("app.dbx", "debug", False),
+    ],
+)
+def test_gated_callsite_parameters(logger_name, method_name, captured):
+    adder = GatedCallsiteParameterAdder(
+        min_level=logging.WARNING, logger_names=["app.db"]
+    )
+    event_dict = adder(logging.getLogger(logger_name), method_name, {})
+    assert ("lineno" in event_dict) is captured
+
+
+@pytest.mark.parametrize(
+    ("fmt", "expected"),
+    [
+        ("iso", "2025-03-04T05:06:07.250000Z"),
+        ("unix", 1741064767.25),
+    ],
+)
+def test_cached_time_stamper_uses_record_time(fmt, expected):
+    record = logging.LogRecord("app", logging.INFO, "", 0, "", None, None)
+    record.created = 1741064767.25
+    stamper = CachedTimeStamper(fmt=fmt)
+    # The second call is served from the cache
+    for _ in range(2):
+        event_dict = stamper(None, "info", {"_record": record})
+        assert event_dict["timestamp"] == expected
+
+
+@pytest.mark.parametrize("fmt", ["iso", "ISO", "%d/%m/%Y %H:%M:%S.%f", "%H:%M"])
+@pytest.mark.parametrize("utc", [True, False])
+@pytest.mark.parametrize(
+    "timestamp",
+    [1741064767.0, 1741064767.25, 1741064767.0000005, 1741064767.9999996],
+)
+def test_cached_time_stamper_matches_time_stamper(
+    monkeypatch: pytest.MonkeyPatch, fmt: str, utc: bool, timestamp: float
+):
+    class FrozenDatetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.datetime.fromtimestamp(timestamp, tz=tz)
+
+    record = logging.LogRecord("app", logging.INFO, "", 0, "", None, None)
+    record.created = timestamp
+    cached = CachedTimeStamper(fmt=fmt, utc=utc)(
+        None, "info", {"_record": record}
+    )
+    with monkeypatch.context() as patch:
+        patch.setattr(datetime, "datetime", FrozenDatetime)
+        expected = TimeStamper(fmt=fmt, utc=utc)(None, "info", {})
+
+    assert cached["timestamp"] == expected["timestamp"]
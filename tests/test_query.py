@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+
+from speedbeaver.query import LogFile
+
+
+def _write(path: Path, *lines: dict) -> None:
+    with path.open("ab") as log_file:
+        for line in lines:
+            log_file.write(orjson.dumps(line) + b"\n")
+
+
+def test_log_file_filters_lines_by_index(tmp_path: Path):
+    log_path = tmp_path / "app.log"
+    _write(
+        log_path,
+        {
+            "event": "a",
+            "level": "debug",
+            "request_id": "r1",
+            "timestamp": "2025-01-02T03:04:05Z",
+        },
+        {
+            "event": "b",
+            "level": "error",
+            "request_id": "r2",
+            "timestamp": "2025-01-02T03:04:06Z",
+        },
+        {
+            "event": "c",
+            "level": "info",
+            "request_id": "r1",
+            "timestamp": "2025-01-02T03:04:07Z",
+        },
+    )
+    with log_path.open("ab") as log_file:
+        log_file.write(b"not json\n")
+
+    with LogFile(log_path) as log_file:
+        assert [line["event"] for line in log_file.request("r1")] == ["a", "c"]
+        assert [line["event"] for line in log_file.lines()] == ["a", "b", "c"]
+        assert [line["event"] for line in log_file.lines(min_level="info")] == [
+            "b",
+            "c",
+        ]
+        since = datetime(2025, 1, 2, 3, 4, 6, tzinfo=timezone.utc)
+        assert [
+            line["event"]
+            for line in log_file.lines(request_id="r1", since=since)
+        ] == ["c"]
+        assert log_file.request("missing") == []
+
+
+def test_log_file_indexes_incrementally(tmp_path: Path):
+    log_path = tmp_path / "app.log"
+    _write(log_path, {"event": "a", "request_id": "r1"})
+    with LogFile(log_path) as log_file:
+        assert len(log_file.entries) == 1
+        # A partially written line waits for its newline
+        with log_path.open("ab") as raw:
+            raw.write(b'{"event": "b", "request_id": "r1"')
+        assert log_file.refresh() == 0
+        with log_path.open("ab") as raw:
+            raw.write(b"}\n")
+        assert log_file.refresh() == 1
+        assert [line["event"] for line in log_file.request("r1")] == ["a", "b"]
+
+    # Reopening loads the sidecar and only parses new lines
+    _write(log_path, {"event": "c", "request_id": "r1"})
+    with LogFile(log_path) as log_file:
+        assert len(log_file.entries) == 3
+        # Kept in one array per field
+        assert list(log_file.entries.levels) == [0, 0, 0]
+        first_length = len(orjson.dumps({"event": "a", "request_id": "r1"}))
+        assert log_file.entries[0][:2] == (0, first_length)
+        assert log_file.entries[-1][4] == log_file.entries[1][4] != 0
+        assert [line["event"] for line in log_file.request("r1")] == [
+            "a",
+            "b",
+            "c",
+        ]
+
+    # A replaced log gets indexed from scratch
+    log_path.unlink()
+    _write(log_path, {"event": "d", "request_id": "r2"})
+    with LogFile(log_path) as log_file:
+        assert len(log_file.entries) == 1
+        assert log_file.request("r1") == []
@@ -0,0 +1,110 @@
+import logging
+import queue
+from pathlib import Path
+
+import pytest
+import structlog
+
+from speedbeaver.config import LogSettings
+from speedbeaver.handlers import (
+    LogFileSettings,
+    LogStreamSettings,
+    LogTestSettings,
+)
+from speedbeaver.queue_handler import (
+    LogQueueSettings,
+    SpeedbeaverQueueHandler,
+    stop_listener,
+)
+
+
+@pytest.fixture(name="queue_logger")
+def fixture_queue_logger(test_id: str):
+    logger = logging.getLogger(f"speedbeaver.test.queue.{test_id}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    yield logger
+    logger.handlers.clear()
+
+
+def test_queue_handler_drains_on_stop(
+    tmp_path: Path, queue_logger: logging.Logger
+):
+    file_handler = logging.FileHandler(tmp_path / "queued.log")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    file_handler.setLevel(logging.INFO)
+
+    handler = LogQueueSettings(max_size=4).handler([file_handler])
+    assert handler is not None
+    assert handler.listener is not None
+    queue_logger.addHandler(handler)
+
+    for i in range(100):
+        queue_logger.info("line %s", i)
+    queue_logger.debug("filtered")
+    handler.listener.stop()
+
+    lines = (tmp_path / "queued.log").read_text().splitlines()
+    assert lines == [f"line {i}" for i in range(100)]
+
+
+@pytest.mark.parametrize(
+    ("overflow", "expected"),
+    [("drop_newest", ["0", "1"]), ("drop_oldest", ["2", "3"])],
+)
+def test_queue_handler_overflow(overflow, expected):
+    log_queue: queue.Queue[logging.LogRecord | None] = queue.Queue(maxsize=2)
+    handler = SpeedbeaverQueueHandler(log_queue, overflow=overflow)
+    for i in range(4):
+        handler.handle(
+            logging.LogRecord("test", logging.INFO, "", 0, str(i), None, None)
+        )
+
+    assert handler.dropped == 2
+    records = [log_queue.get_nowait() for _ in range(2)]
+    assert [record.msg for record in records if record] == expected
+
+
+def test_queue_handler_keeps_the_sentinel_when_dropping_oldest():
+    log_queue: queue.Queue[logging.LogRecord | None] = queue.Queue(maxsize=2)
+    handler = SpeedbeaverQueueHandler(log_queue, overflow="drop_oldest")
+    log_queue.put(None)
+    log_queue.put(
+        logging.LogRecord("test", logging.INFO, "", 0, "0", None, None)
+    )
+    handler.handle(
+        logging.LogRecord("test", logging.INFO, "", 0, "1", None, None)
+    )
+
+    assert handler.dropped == 1
+    assert [log_queue.get_nowait() for _ in range(2)][1] is None
+
+
+@pytest.mark.usefixtures("restore_logging")
+@pytest.mark.parametrize("fast_console", [False, True])
+def test_queued_exceptions_keep_their_traceback(
+    tmp_path: Path, fast_console: bool
+):
+    log_path = tmp_path / "queued.log"
+    LogSettings(
+        async_handlers=True,
+        stream=LogStreamSettings(enabled=False),
+        file=LogFileSettings(
+            enabled=True, file_name=str(log_path), fast_console=fast_console
+        ),
+        test=LogTestSettings(file_name=str(tmp_path / "queued.json")),
+    ).configure(force=True)
+    logger = structlog.stdlib.get_logger("speedbeaver.test.queue")
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    logger.info("Handled", exc_info=True)
+    # Renders whatever is still queued
+    stop_listener()
+
+    text = log_path.read_text()
+    assert "ValueError: boom" in text
+    # Nothing was being handled for the second one
+    assert text.count("Traceback") == 1
@@ -0,0 +1,31 @@
+import structlog
+
+from speedbeaver.renderers import FastConsoleRenderer
+
+
+def test_fast_console_renderer_layout():
+    event_dict = {
+        "timestamp": "2025-01-01T00:00:00Z",
+        "level": "info",
+        "event": "hello",
+        "logger": "app",
+        "b": 1,
+        "a": "x",
+    }
+    reference = structlog.dev.ConsoleRenderer(colors=False)(
+        None, "info", dict(event_dict)
+    )
+    rendered = FastConsoleRenderer(colors=False)(None, "info", event_dict)
+    # Same columns, but keys keep their insertion order instead of sorting
+    assert rendered == reference.replace("a=x b=1", "b=1 a=x")
+
+
+def test_fast_console_renderer_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        rendered = FastConsoleRenderer(colors=False)(
+            None, "error", {"event": "failed", "exc_info": True}
+        )
+    assert rendered.startswith("failed\nTraceback")
+    assert rendered.endswith("ValueError: boom")
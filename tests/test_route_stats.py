@@ -0,0 +1,35 @@
+from speedbeaver.route_stats import LatencyHistogram, RouteLatencyStats
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for duration_ms in range(1, 1001):
+        histogram.observe(duration_ms * 1000)
+
+    # Estimates land in a bucket at most 25% wider than the true value
+    for fraction in (0.5, 0.9, 0.99):
+        exact = fraction * 1_000_000
+        assert exact <= histogram.percentile(fraction) <= exact * 1.25
+    assert histogram.percentile(1.0) == histogram.max_us == 1_000_000
+
+
+def test_route_latency_stats_summarizes_each_interval():
+    stats = RouteLatencyStats(interval=0)
+    summary = stats.record("GET", "/items/{item_id}", 200, 2_000_000)
+    assert summary is not None
+    assert summary["routes"] == [
+        {
+            "method": "GET",
+            "route": "/items/{item_id}",
+            "status_class": "2xx",
+            "count": 1,
+            "p50_ms": 2.0,
+            "p90_ms": 2.0,
+            "p99_ms": 2.0,
+            "max_ms": 2.0,
+        }
+    ]
+    # The next interval starts empty
+    summary = stats.record("POST", "/items", 500, 1_000_000)
+    assert summary is not None
+    assert [route["route"] for route in summary["routes"]] == ["/items"]
@@ -0,0 +1,157 @@
+import os
+import signal
+import time
+from pathlib import Path
+
+import orjson
+import pytest
+import structlog
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import SecretStr
+
+from speedbeaver.config import LogSettings
+from speedbeaver.handlers import (
+    LogFileSettings,
+    LogStreamSettings,
+    LogTestSettings,
+)
+from speedbeaver.middleware import quick_configure
+from speedbeaver.runtime import (
+    LogConfigUpdate,
+    RuntimeControlSettings,
+    SinkUpdate,
+    get_log_config,
+    toggle_verbose,
+    update_log_config,
+)
+
+
+def _events(path: Path) -> list[str]:
+    return [
+        orjson.loads(line)["event"] for line in path.read_bytes().splitlines()
+    ]
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_update_log_config_applies_to_bound_loggers(tmp_path: Path):
+    log_path = tmp_path / "runtime.test.log"
+    LogSettings(
+        stream=LogStreamSettings(enabled=False),
+        test=LogTestSettings(file_name=str(log_path), log_level="INFO"),
+    ).configure(force=True)
+    # Bound like a cached logger, so it keeps its wrapper class
+    logger = structlog.stdlib.get_logger("speedbeaver.test.runtime").bind()
+
+    logger.debug("hidden")
+    update_log_config(
+        LogConfigUpdate(sinks={"test": SinkUpdate(log_level="DEBUG")})
+    )
+    logger.debug("shown")
+    update_log_config(
+        LogConfigUpdate(loggers={"speedbeaver.test.runtime": "WARNING"})
+    )
+    logger.info("quieted")
+    state = update_log_config(
+        LogConfigUpdate(loggers={"speedbeaver.test.runtime": None})
+    )
+    assert state["min_level"] == "DEBUG"
+    assert state["loggers"] == {}
+    logger.info("back")
+
+    state = toggle_verbose("DEBUG")
+    assert state["verbose"]
+    state = toggle_verbose("DEBUG")
+    assert not state["verbose"]
+    assert state["sinks"]["test"]["log_level"] == "DEBUG"
+
+    update_log_config(
+        LogConfigUpdate(sinks={"test": SinkUpdate(enabled=False)})
+    )
+    logger.warning("dropped")
+    assert not get_log_config()["sinks"]["test"]["enabled"]
+    assert _events(log_path) == ["shown", "back"]
+
+
+@pytest.mark.usefixtures("restore_logging")
+async def test_runtime_control_route_requires_token(tmp_path: Path):
+    app = FastAPI()
+    quick_configure(
+        app,
+        stream=LogStreamSettings(enabled=False),
+        test=LogTestSettings(file_name=str(tmp_path / "runtime.test.log")),
+        runtime_control=RuntimeControlSettings(
+            enabled=True, token=SecretStr("secret")
+        ),
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        response = await client.get("/logging/config")
+        assert response.status_code == 403
+
+        headers = {"Authorization": "Bearer secret"}
+        response = await client.post(
+            "/logging/config",
+            headers=headers,
+            json={"sinks": {"test": {"log_level": "ERROR"}}},
+        )
+        assert response.status_code == 200
+        assert response.json()["sinks"]["test"]["log_level"] == "ERROR"
+
+        response = await client.post(
+            "/logging/config",
+            headers=headers,
+            json={"sinks": {"nope": {"log_level": "ERROR"}}},
+        )
+        assert response.status_code == 422
+
+        # The file sink has nowhere to write to
+        response = await client.post(
+            "/logging/config",
+            headers=headers,
+            json={"sinks": {"file": {"enabled": True}}},
+        )
+        assert response.status_code == 409
+        assert not get_log_config()["sinks"]["file"]["enabled"]
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_update_log_config_enables_a_sink(tmp_path: Path):
+    file_path = tmp_path / "enabled.log"
+    LogSettings(
+        stream=LogStreamSettings(enabled=False),
+        file=LogFileSettings(
+            file_name=str(file_path), json_logs=True, buffer_size=0
+        ),
+        test=LogTestSettings(file_name=str(tmp_path / "runtime.test.log")),
+    ).configure(force=True)
+    logger = structlog.stdlib.get_logger("speedbeaver.test.runtime").bind()
+
+    logger.info("before")
+    state = update_log_config(
+        LogConfigUpdate(sinks={"file": SinkUpdate(enabled=True)})
+    )
+    assert state["sinks"]["file"]["enabled"]
+    logger.info("after")
+
+    assert _events(file_path) == ["after"]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+@pytest.mark.usefixtures("restore_logging")
+def test_signal_toggles_verbose(tmp_path: Path):
+    previous = signal.getsignal(signal.SIGUSR1)
+    LogSettings(
+        stream=LogStreamSettings(enabled=False),
+        test=LogTestSettings(file_name=str(tmp_path / "runtime.test.log")),
+        runtime_control=RuntimeControlSettings(signal="SIGUSR1"),
+    ).configure(force=True)
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.monotonic() + 5
+        while not get_log_config()["verbose"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert get_log_config()["verbose"]
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
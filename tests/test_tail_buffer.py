@@ -0,0 +1,87 @@
+import logging
+from pathlib import Path
+
+import pytest
+import structlog
+
+from speedbeaver.config import LogSettings
+from speedbeaver.handlers import (
+    BufferedFileHandler,
+    FanOutHandler,
+    LogFileSettings,
+    LogOutput,
+    LogStreamSettings,
+    LogTestSettings,
+)
+from speedbeaver.tail_buffer import (
+    TailBufferFilter,
+    TailBufferSettings,
+    end_request_buffer,
+    start_request_buffer,
+)
+
+
+@pytest.fixture(name="tail_log_path")
+def fixture_tail_log_path(tmp_path: Path):
+    log_path = tmp_path / "tail.log"
+    sink = BufferedFileHandler(log_path, buffer_size=0)
+    sink.setLevel(logging.INFO)
+    handler = FanOutHandler([], [(LogOutput(), sink)])
+    handler.addFilter(TailBufferFilter(logging.INFO))
+
+    root_logger = logging.getLogger()
+    previous = root_logger.handlers, root_logger.level
+    root_logger.handlers = [handler]
+    root_logger.setLevel(logging.DEBUG)
+    try:
+        yield log_path
+    finally:
+        root_logger.handlers, root_logger.level = previous
+        handler.close()
+
+
+def test_tail_buffer_flushes_only_on_failure(tail_log_path: Path):
+    logger = logging.getLogger("speedbeaver.test.tail")
+
+    token = start_request_buffer(max_size=10)
+    logger.debug("discarded")
+    end_request_buffer(token, flush=False)
+    assert tail_log_path.read_text() == ""
+
+    token = start_request_buffer(max_size=10)
+    logger.debug("trail")
+    logger.info("written right away")
+    end_request_buffer(token, flush=True)
+    # Flushed events skip the sink's INFO level
+    assert tail_log_path.read_text() == "written right away\ntrail\n"
+
+    # Outside of a request nothing is buffered, so the sink's level applies
+    logger.debug("outside")
+    assert tail_log_path.read_text() == "written right away\ntrail\n"
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_tail_buffer_keeps_the_traceback(tmp_path: Path):
+    log_path = tmp_path / "tail.log"
+    LogSettings(
+        stream=LogStreamSettings(enabled=False),
+        file=LogFileSettings(
+            enabled=True,
+            file_name=str(log_path),
+            fast_console=True,
+            log_level="INFO",
+        ),
+        test=LogTestSettings(file_name=str(tmp_path / "tail.json")),
+        tail_buffer=TailBufferSettings(enabled=True),
+    ).configure(force=True)
+    logger = structlog.stdlib.get_logger("speedbeaver.test.tail").bind()
+
+    token = start_request_buffer(max_size=10)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.debug("Failed", exc_info=True)
+    end_request_buffer(token, flush=True)
+    logging.getLogger().handlers[0].flush()
+
+    assert "ValueError: boom" in log_path.read_text()